@@ -8,12 +8,29 @@ from routes.tweets import tweets_bp
 from config import Config
 import threading
 import asyncio
-from services.fetch_tweets import fetch_tweets_for_all_users
+from services.fetch_tweets import fetch_tweets_for_users, load_user_groups
 from services.fetch_tweets import post_tweets_for_all_users
+from services.schema import ensure_schema
+from services.translation_cache import translation_cache
+from services.openai_client import close_openai_clients
+from services.db_service import close_db, db_pool
+from services.seen_tweets import seen_tweet_index
+from services.fetch_cursors import fetch_cursor_store
+from services.rate_limiter import collected_limiter, posted_limiter
+from services.outbound_limiter import outbound_stats
+from services.scheduler import fetch_scheduler
+from services.pipeline import tweet_pipeline
+from services.simhash import near_duplicate_index
+from services.change_feed import account_change_feed
+from services.http_session import close_http_session
+from services.language_id import language_identifier
+from services.content_filters import content_filter
 
 app = Flask(__name__)
 app.config.from_object(Config)
 CORS(app, origins=["http://localhost:3000"], supports_credentials=True)
+# Devolver al pool la conexión tomada durante cada petición o contexto
+app.teardown_appcontext(close_db)
 
 # Variables globales para el hilo y el evento
 fetcher_thread = None
@@ -28,29 +45,64 @@ app.register_blueprint(logs_bp, url_prefix="/logs")
 app.register_blueprint(monitored_bp, url_prefix="/api")
 app.register_blueprint(tweets_bp, url_prefix="/tweets")
 
+def verify_schema():
+    """ Verifica el esquema auxiliar; devuelve False (y lo informa) si alguna sentencia falló. """
+    try:
+        ensure_schema()
+    except Exception as e:
+        print(f"❌ No se pudo verificar el esquema: {e}")
+        return False
+    return True
+
+# El esquema se verifica al arrancar los servicios de recolección y publicación,
+# o una sola vez al desplegar con `flask --app app init-schema` (no al importar:
+# cada worker de gunicorn lo repetiría).
+@app.cli.command("init-schema")
+def init_schema_command():
+    """ Crea o actualiza las tablas auxiliares que usan las rutas y los servicios. """
+    if not verify_schema():
+        raise SystemExit(1)
+
 @app.route("/")
 def home():
     return {"message": "Bienvenido a la API de Twitter Bot"}
 
+def poster_running():
+    """ El modo pipeline publica solo mientras el publicador está en marcha. """
+    return poster_thread is not None and poster_thread.is_alive() and not posting_event.is_set()
+
 def start_tweet_fetcher():
     print('🚀 Iniciando el servicio de recolección de tweets...')
 
     async def fetch_loop():
         with app.app_context():
-            while not fetching_event.is_set():
-                try:
-                    task = asyncio.create_task(fetch_tweets_for_all_users(fetching_event))
-                    await task 
-                    if fetching_event.is_set():
-                        break 
-                    print("⏳ Esperando 30 segundos antes de la próxima búsqueda...")
-                    await asyncio.sleep(30) 
-                except asyncio.CancelledError:
-                    print("⏹️ Tarea cancelada por solicitud de detención.")
-                    break
-                except Exception as e:
-                    print(f"❌ Error en fetch_loop: {e}")
-                    break
+            # Sin el esquema (índices únicos, tablas auxiliares) la ingesta fallaría en silencio
+            if not verify_schema():
+                print("⏹️ Servicio de recolección detenido.")
+                return
+            await seen_tweet_index.warm()
+            await fetch_cursor_store.load()
+            dispatch = fetch_tweets_for_users
+            if Config.PIPELINE_MODE:
+                await tweet_pipeline.start(poster_running)
+                dispatch = tweet_pipeline.fetch_users
+            # Cambios de cuentas al instante: solo se actualiza la cuenta modificada
+            feed_task = None
+            if Config.ACCOUNT_CHANGES_ENABLED:
+                feed_task = asyncio.create_task(account_change_feed.run(fetching_event))
+            try:
+                # Cada usuario se recolecta cuando le toca según su actividad reciente
+                await fetch_scheduler.run(dispatch, load_user_groups, fetching_event)
+            except asyncio.CancelledError:
+                print("⏹️ Tarea cancelada por solicitud de detención.")
+            except Exception as e:
+                print(f"❌ Error en fetch_loop: {e}")
+            if feed_task is not None:
+                feed_task.cancel()
+                await asyncio.gather(feed_task, return_exceptions=True)
+            await tweet_pipeline.stop()
+            await close_openai_clients()
+            await close_http_session()
 
         print("⏹️ Servicio de recolección detenido.")
 
@@ -62,6 +114,9 @@ def start_tweet_poster():
 
     async def post_loop():
         with app.app_context():
+            if not verify_schema():
+                print("⏹️ Servicio de publicación detenido.")
+                return
             while not posting_event.is_set():
                 try:
                     task = asyncio.create_task(post_tweets_for_all_users(posting_event))
@@ -76,6 +131,7 @@ def start_tweet_poster():
                 except Exception as e:
                     print(f"❌ Error en post_loop: {e}")
                     break
+            await close_http_session()
 
         print("⏹️ Servicio de publicación detenido.")
         
@@ -113,9 +169,21 @@ def status_fetch():
     global fetcher_thread
 
     if fetcher_thread is not None and fetcher_thread.is_alive():
-        return jsonify({"status": "running"}), 200
+        status = "running"
     else:
-        return jsonify({"status": "stopped"}), 200
+        status = "stopped"
+
+    return jsonify({
+        "status": status,
+        "translation_cache": translation_cache.stats(),
+        "rate_limits": collected_limiter.stats(),
+        "outbound": outbound_stats(),
+        "scheduler": fetch_scheduler.stats(),
+        "near_duplicates": near_duplicate_index.stats(),
+        "account_changes": account_change_feed.stats(),
+        "language_id": language_identifier.stats(),
+        "content_filters": content_filter.stats()
+    }), 200
 
 
 @app.route("/start-post", methods=["POST"])
@@ -148,11 +216,32 @@ def status_post():
     global poster_thread
 
     if poster_thread is not None and poster_thread.is_alive():
-        return jsonify({"status": "running"}), 200
+        status = "running"
     else:
-        return jsonify({"status": "stopped"}), 200
+        status = "stopped"
+
+    return jsonify({"status": status, "rate_limits": posted_limiter.stats(), "outbound": outbound_stats()}), 200
+
+
+@app.route("/status-pipeline", methods=["GET"])
+def status_pipeline():
+    """
+    Profundidad de las colas y throughput de cada etapa del modo pipeline.
+    """
+    return jsonify(tweet_pipeline.stats()), 200
+
+
+@app.route("/status-db", methods=["GET"])
+def status_db():
+    """
+    Estadísticas del pool de conexiones para dimensionarlo según los hilos/workers de gunicorn.
+    """
+    return jsonify(db_pool.stats()), 200
 
 
 if __name__ == "__main__":
+    # Servidor de desarrollo: un solo proceso, así que el esquema se verifica aquí
+    with app.app_context():
+        verify_schema()
     # Usamos `app.run()` con threaded=True para manejar múltiples solicitudes
     app.run(debug=True, threaded=True)
\ No newline at end of file
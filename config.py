@@ -14,3 +14,123 @@ class Config:
     
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     SOCIALDATA_API_KEY = os.getenv("SOCIALDATA_API_KEY")
+
+    # Segundos que se reutilizan las API keys leídas de la tabla api_keys
+    API_KEYS_CACHE_TTL_SECONDS = int(os.getenv("API_KEYS_CACHE_TTL_SECONDS", 300))
+
+    DB_HOST = os.getenv("DB_HOST")
+    DB_PORT = os.getenv("DB_PORT", "5432")
+    DB_NAME = os.getenv("DB_NAME")
+    DB_USER = os.getenv("DB_USER")
+    DB_PASSWORD = os.getenv("DB_PASSWORD")
+
+    # Pool de conexiones compartido por las peticiones HTTP y los servicios en segundo plano
+    DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", 1))
+    DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", 10))
+    DB_POOL_MAX_IDLE_SECONDS = float(os.getenv("DB_POOL_MAX_IDLE_SECONDS", 300))
+    DB_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("DB_POOL_HEALTH_CHECK_SECONDS", 30))
+    DB_POOL_CHECKOUT_TIMEOUT = float(os.getenv("DB_POOL_CHECKOUT_TIMEOUT", 10))
+
+    # Hilos que ejecutan las consultas de los servicios en segundo plano
+    DB_ASYNC_WORKERS = int(os.getenv("DB_ASYNC_WORKERS", 5))
+
+    # Caché de traducciones (memoria + tabla translation_cache)
+    TRANSLATION_CACHE_MAX_ENTRIES = int(os.getenv("TRANSLATION_CACHE_MAX_ENTRIES", 5000))
+    TRANSLATION_CACHE_TTL_SECONDS = int(os.getenv("TRANSLATION_CACHE_TTL_SECONDS", 6 * 3600))
+    TRANSLATION_CACHE_DB_TTL_DAYS = int(os.getenv("TRANSLATION_CACHE_DB_TTL_DAYS", 7))
+
+    # Cliente asíncrono de OpenAI
+    OPENAI_RATE_PER_SECOND = float(os.getenv("OPENAI_RATE_PER_SECOND", 5))
+    OPENAI_BURST = int(os.getenv("OPENAI_BURST", 10))
+    OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", 5))
+    OPENAI_TIMEOUT_SECONDS = float(os.getenv("OPENAI_TIMEOUT_SECONDS", 30))
+    OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 3))
+    OPENAI_BACKOFF_BASE_SECONDS = float(os.getenv("OPENAI_BACKOFF_BASE_SECONDS", 1))
+
+    # Sesión HTTP compartida (SocialData y RapidAPI): conexiones reutilizadas y timeouts
+    HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", 100))
+    HTTP_MAX_CONNECTIONS_PER_HOST = int(os.getenv("HTTP_MAX_CONNECTIONS_PER_HOST", 10))
+    HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", 60))
+    HTTP_DNS_CACHE_SECONDS = int(os.getenv("HTTP_DNS_CACHE_SECONDS", 300))
+    HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", 10))
+    HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", 30))
+    HTTP_TOTAL_TIMEOUT_SECONDS = float(os.getenv("HTTP_TOTAL_TIMEOUT_SECONDS", 60))
+
+    # Timeout total de las publicaciones en RapidAPI
+    RAPIDAPI_TIMEOUT_SECONDS = float(os.getenv("RAPIDAPI_TIMEOUT_SECONDS", 20))
+
+    # Límites de salida por proveedor (token bucket + concurrencia máxima)
+    SOCIALDATA_RATE_PER_SECOND = float(os.getenv("SOCIALDATA_RATE_PER_SECOND", 2))
+    SOCIALDATA_BURST = int(os.getenv("SOCIALDATA_BURST", 5))
+    SOCIALDATA_MAX_CONCURRENCY = int(os.getenv("SOCIALDATA_MAX_CONCURRENCY", 5))
+    SOCIALDATA_MAX_RETRIES = int(os.getenv("SOCIALDATA_MAX_RETRIES", 3))
+    RAPIDAPI_RATE_PER_SECOND = float(os.getenv("RAPIDAPI_RATE_PER_SECOND", 1))
+    RAPIDAPI_BURST = int(os.getenv("RAPIDAPI_BURST", 2))
+    RAPIDAPI_MAX_CONCURRENCY = int(os.getenv("RAPIDAPI_MAX_CONCURRENCY", 2))
+    RAPIDAPI_MAX_RETRIES = int(os.getenv("RAPIDAPI_MAX_RETRIES", 3))
+    OUTBOUND_BACKOFF_BASE_SECONDS = float(os.getenv("OUTBOUND_BACKOFF_BASE_SECONDS", 1))
+
+    # Días de tweets vistos que se precargan en memoria al iniciar el recolector
+    SEEN_TWEETS_RETENTION_DAYS = int(os.getenv("SEEN_TWEETS_RETENTION_DAYS", 30))
+
+    # Largo máximo de cada consulta enviada a SocialData (se divide en shards si se supera)
+    SOCIALDATA_MAX_QUERY_LENGTH = int(os.getenv("SOCIALDATA_MAX_QUERY_LENGTH", 500))
+    SOCIALDATA_SHARD_CONCURRENCY = int(os.getenv("SOCIALDATA_SHARD_CONCURRENCY", 5))
+
+    # "query": SocialData filtra por keywords; "timeline": se descargan los tweets
+    # de cada usuario monitoreado y las keywords se buscan localmente
+    FETCH_MODE = os.getenv("FETCH_MODE", "query")
+    TIMELINE_HANDLES_PER_QUERY = int(os.getenv("TIMELINE_HANDLES_PER_QUERY", 10))
+
+    # Planificador adaptativo de la recolección por usuario
+    FETCH_MIN_INTERVAL_SECONDS = float(os.getenv("FETCH_MIN_INTERVAL_SECONDS", 30))
+    FETCH_MAX_INTERVAL_SECONDS = float(os.getenv("FETCH_MAX_INTERVAL_SECONDS", 600))
+    FETCH_MAX_CONCURRENT_USERS = int(os.getenv("FETCH_MAX_CONCURRENT_USERS", 10))
+    FETCH_ACTIVITY_SMOOTHING = float(os.getenv("FETCH_ACTIVITY_SMOOTHING", 0.3))
+    FETCH_USERS_REFRESH_SECONDS = float(os.getenv("FETCH_USERS_REFRESH_SECONDS", 60))
+
+    # Cambios de cuentas por LISTEN/NOTIFY (canal account_changes)
+    ACCOUNT_CHANGES_ENABLED = os.getenv("ACCOUNT_CHANGES_ENABLED", "true").lower() == "true"
+    ACCOUNT_CHANGES_POLL_SECONDS = float(os.getenv("ACCOUNT_CHANGES_POLL_SECONDS", 1))
+    ACCOUNT_CHANGES_RECONNECT_SECONDS = float(os.getenv("ACCOUNT_CHANGES_RECONNECT_SECONDS", 5))
+    # Con el canal conectado, la resincronización completa de usuarios es solo un respaldo
+    ACCOUNT_CHANGES_RESYNC_SECONDS = float(os.getenv("ACCOUNT_CHANGES_RESYNC_SECONDS", 900))
+
+    # Modo pipeline: recolectar → deduplicar → traducir → guardar → publicar con colas acotadas
+    PIPELINE_MODE = os.getenv("PIPELINE_MODE", "false").lower() == "true"
+    PIPELINE_QUEUE_SIZE = int(os.getenv("PIPELINE_QUEUE_SIZE", 100))
+    PIPELINE_DEDUPE_WORKERS = int(os.getenv("PIPELINE_DEDUPE_WORKERS", 1))
+    PIPELINE_TRANSLATE_WORKERS = int(os.getenv("PIPELINE_TRANSLATE_WORKERS", 3))
+    PIPELINE_PERSIST_WORKERS = int(os.getenv("PIPELINE_PERSIST_WORKERS", 2))
+    PIPELINE_POST_WORKERS = int(os.getenv("PIPELINE_POST_WORKERS", 1))
+    PIPELINE_DRAIN_TIMEOUT_SECONDS = float(os.getenv("PIPELINE_DRAIN_TIMEOUT_SECONDS", 3))
+
+    # Cola de publicación (post_queue)
+    POST_QUEUE_SPREAD = os.getenv("POST_QUEUE_SPREAD", "true").lower() == "true"
+    POST_QUEUE_CLAIM_TIMEOUT_SECONDS = int(os.getenv("POST_QUEUE_CLAIM_TIMEOUT_SECONDS", 300))
+    POST_QUEUE_MAX_ATTEMPTS = int(os.getenv("POST_QUEUE_MAX_ATTEMPTS", 5))
+    POST_QUEUE_RETRY_SECONDS = int(os.getenv("POST_QUEUE_RETRY_SECONDS", 300))
+
+    # Hashes de tweets publicados que se mantienen en memoria por usuario
+    POSTED_HASH_CACHE_SIZE = int(os.getenv("POSTED_HASH_CACHE_SIZE", 1000))
+
+    # Detección de tweets casi duplicados (SimHash de 64 bits + LSH por bandas)
+    SIMHASH_MAX_DISTANCE = int(os.getenv("SIMHASH_MAX_DISTANCE", 3))
+    SIMHASH_BANDS = int(os.getenv("SIMHASH_BANDS", 4))
+    SIMHASH_WINDOW_HOURS = float(os.getenv("SIMHASH_WINDOW_HOURS", 24))
+    SIMHASH_MAX_PER_USER = int(os.getenv("SIMHASH_MAX_PER_USER", 5000))
+
+    # Identificación local del idioma (se omite la traducción si el tweet ya está en el idioma de la cuenta)
+    LANGUAGE_ID_MIN_LETTERS = int(os.getenv("LANGUAGE_ID_MIN_LETTERS", 20))
+    LANGUAGE_ID_MIN_MARGIN = float(os.getenv("LANGUAGE_ID_MIN_MARGIN", 0.15))
+
+    # Filtros de contenido previos a la traducción (valores por defecto de account_filters)
+    CONTENT_FILTER_SKIP_RETWEETS = os.getenv("CONTENT_FILTER_SKIP_RETWEETS", "true").lower() == "true"
+    CONTENT_FILTER_SKIP_REPLIES = os.getenv("CONTENT_FILTER_SKIP_REPLIES", "true").lower() == "true"
+    CONTENT_FILTER_SKIP_QUOTES = os.getenv("CONTENT_FILTER_SKIP_QUOTES", "false").lower() == "true"
+    CONTENT_FILTER_MIN_LENGTH = int(os.getenv("CONTENT_FILTER_MIN_LENGTH", 10))
+    CONTENT_FILTER_SKIP_URL_ONLY = os.getenv("CONTENT_FILTER_SKIP_URL_ONLY", "true").lower() == "true"
+    CONTENT_FILTER_BLOCKED_TERMS = tuple(
+        term.strip() for term in os.getenv("CONTENT_FILTER_BLOCKED_TERMS", "").split(",") if term.strip()
+    )
+    CONTENT_FILTER_MAX_TRANSLATED_LENGTH = int(os.getenv("CONTENT_FILTER_MAX_TRANSLATED_LENGTH", 280))
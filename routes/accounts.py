@@ -1,5 +1,7 @@
 from flask import Blueprint, jsonify, request
 from services.db_service import run_query
+from services.keyword_matcher import keyword_matcher
+from services.content_filters import FILTER_COLUMNS, get_filter_settings, save_filter_settings
 
 accounts_bp = Blueprint("accounts", __name__)
 
@@ -99,6 +101,9 @@ def update_account(twitter_id):
     for keyword in keywords:
         run_query(f"INSERT INTO user_keywords (user_id, keyword) VALUES ({user_id}, '{keyword}')")
 
+    # Actualizar el autómata de keywords sin esperar al próximo ciclo
+    keyword_matcher.update_account(user_id, monitored_users, keywords)
+
     return jsonify({"message": "Cuenta actualizada correctamente"}), 200
 
 
@@ -115,5 +120,49 @@ def delete_account(twitter_id):
     run_query(f"DELETE FROM monitored_users WHERE user_id = {user_id}")
     run_query(f"DELETE FROM user_keywords WHERE user_id = {user_id}")
     run_query(f"DELETE FROM users WHERE id = {user_id}")
+    keyword_matcher.remove_account(user_id)
+
+    return jsonify({"message": "Cuenta eliminada correctamente"}), 200
+
+
+@accounts_bp.route("/account/<string:twitter_id>/filters", methods=["GET"])
+def get_account_filters(twitter_id):
+    user_data = run_query(f"SELECT id FROM users WHERE twitter_id = '{twitter_id}'", fetchone=True)
+
+    if not user_data:
+        return jsonify({"error": "Cuenta no encontrada"}), 404
+
+    return jsonify(get_filter_settings(user_data[0])._asdict()), 200
+
+
+@accounts_bp.route("/account/<string:twitter_id>/filters", methods=["PUT"])
+def update_account_filters(twitter_id):
+    """
+    Actualiza los filtros de contenido de la cuenta. Los campos omitidos o en
+    null usan el valor por defecto del servidor.
+    """
+    data = request.json or {}
+
+    user_data = run_query(f"SELECT id FROM users WHERE twitter_id = '{twitter_id}'", fetchone=True)
+    if not user_data:
+        return jsonify({"error": "Cuenta no encontrada"}), 404
 
-    return jsonify({"message": "Cuenta eliminada correctamente"}), 200
\ No newline at end of file
+    values = {}
+    for column in FILTER_COLUMNS:
+        value = data.get(column)
+        if value is None:
+            continue
+        if column == "blocked_terms":
+            if not isinstance(value, list) or not all(isinstance(term, str) for term in value):
+                return jsonify({"error": "blocked_terms debe ser una lista de textos"}), 400
+        elif column.startswith("skip_"):
+            if not isinstance(value, bool):
+                return jsonify({"error": f"{column} debe ser true o false"}), 400
+        elif isinstance(value, bool) or not isinstance(value, int) or value < 0:
+            return jsonify({"error": f"{column} debe ser un entero no negativo"}), 400
+        values[column] = value
+
+    settings = save_filter_settings(user_data[0], values)
+    if settings is None:
+        return jsonify({"error": "No se pudieron guardar los filtros"}), 500
+    return jsonify(settings._asdict()), 200
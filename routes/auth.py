@@ -1,6 +1,7 @@
 from flask import Blueprint, redirect, request, session, url_for, jsonify
 from requests_oauthlib import OAuth1Session
 from services.db_service import run_query
+from services.credentials import credentials
 from config import Config
 import requests
 import logging
@@ -13,10 +14,8 @@ ACCESS_TOKEN_URL = "https://api.twitter.com/oauth/access_token"
 CALLBACK_URL = "http://localhost:5000/auth/callback" 
 
 def get_rapidapi_key():
-    """ Obtiene la API Key de RapidAPI desde la base de datos. """
-    query = "SELECT key FROM api_keys WHERE id = 3"  # ID 3 es para RapidAPI
-    result = run_query(query, fetchone=True)
-    return result[0] if result else None
+    """ Obtiene la API Key de RapidAPI (caché de api_keys). """
+    return credentials.get("rapidapi")
 
 # @auth_bp.route("/login")
 # def login():
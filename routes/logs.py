@@ -1,5 +1,6 @@
 from flask import Blueprint, jsonify, request
 from services.db_service import run_query
+from services.credentials import credentials
 import logging
 
 logs_bp = Blueprint("logs", __name__)
@@ -90,6 +91,9 @@ def update_api_key():
             query = f"UPDATE api_keys SET key = '{key_value}' WHERE id ={id_key}"
             run_query(query)
 
+        # Las claves nuevas se usan desde la próxima llamada
+        credentials.invalidate()
+
         return jsonify({"message": "API Keys actualizadas correctamente"}), 200
 
     except Exception as e:
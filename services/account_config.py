@@ -0,0 +1,130 @@
+import threading
+from collections import namedtuple
+from config import Config
+from services.db_service import run_query_async, quote_literal
+from services.content_filters import FILTER_COLUMNS, filter_settings_from_row
+
+# Configuración inmutable de una cuenta para un ciclo de recolección
+AccountConfig = namedtuple(
+    "AccountConfig",
+    ["id", "language", "custom_style", "rate_limit", "handles", "keywords", "filters"]
+)
+
+
+def custom_style_prompt(account):
+    """ Instrucción de estilo que se agrega al prompt de traducción ('' si no hay). """
+    if account.custom_style and len(account.custom_style) > 0:
+        return f'Custom Style: {account.custom_style}'
+    return ''
+
+
+def source_group(account):
+    """
+    Fuente compartida de la cuenta: las que tienen el mismo conjunto de keywords
+    se consultan juntas (modo query); en modo timeline, las que monitorean los
+    mismos usuarios.
+    """
+    if Config.FETCH_MODE == "timeline":
+        return tuple(sorted({handle.lower() for handle in account.handles}))
+    return tuple(sorted(set(account.keywords)))
+
+
+async def load_account_configs(user_ids=None):
+    """
+    Snapshot de la configuración de las cuentas (idioma, estilo, límite por
+    hora, usuarios monitoreados, keywords y filtros de contenido) con una sola consulta.
+    Devuelve {user_id: AccountConfig}.
+    """
+    users_filter = ""
+    if user_ids is not None:
+        user_ids = [int(user_id) for user_id in user_ids]
+        if not user_ids:
+            return {}
+        users_filter = f"WHERE u.id IN ({', '.join(quote_literal(str(user_id)) for user_id in user_ids)})"
+
+    query = f"""
+    SELECT u.id, u.language, u.custom_style, u.rate_limit,
+           COALESCE(m.handles, ARRAY[]::text[]), COALESCE(k.keywords, ARRAY[]::text[]),
+           {", ".join(f"f.{column}" for column in FILTER_COLUMNS)}
+    FROM users u
+    LEFT JOIN LATERAL (
+        SELECT array_agg(DISTINCT twitter_username::text) AS handles
+        FROM monitored_users WHERE user_id = u.id
+    ) m ON TRUE
+    LEFT JOIN LATERAL (
+        SELECT array_agg(DISTINCT keyword::text) AS keywords
+        FROM user_keywords WHERE user_id = u.id
+    ) k ON TRUE
+    LEFT JOIN account_filters f ON f.user_id = u.id
+    {users_filter}
+    """
+    rows = await run_query_async(query, fetchall=True) or []
+    return {
+        row[0]: AccountConfig(
+            id=row[0],
+            language=row[1],
+            custom_style=row[2],
+            rate_limit=row[3],
+            handles=tuple(handle for handle in row[4] if handle),
+            keywords=tuple(keyword for keyword in row[5] if keyword),
+            filters=filter_settings_from_row(row[6:]),
+        )
+        for row in rows
+    }
+
+
+class AccountConfigStore:
+    """
+    Snapshots de configuración que se reutilizan entre ciclos mientras el canal
+    de cambios (LISTEN/NOTIFY) está conectado: solo se vuelven a consultar las
+    cuentas que cambiaron. Sin canal, cada ciclo consulta la configuración.
+    """
+
+    def __init__(self):
+        self._configs = {}
+        self._tracking = False
+        # Cambia con cada invalidación, para no guardar una carga que quedó vieja en el camino
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def track(self):
+        """ El canal de cambios está conectado: a partir de ahora se puede reutilizar. """
+        with self._lock:
+            self._tracking = True
+            self._generation += 1
+
+    def untrack(self):
+        """ El canal se desconectó: los snapshots pueden haber quedado viejos. """
+        with self._lock:
+            self._tracking = False
+            self._configs = {}
+            self._generation += 1
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._configs.pop(int(user_id), None)
+            self._generation += 1
+
+    async def get_many(self, user_ids):
+        """ Devuelve {user_id: AccountConfig}, consultando solo las cuentas que no están en memoria. """
+        user_ids = [int(user_id) for user_id in user_ids]
+        with self._lock:
+            generation = self._generation
+            cached = {user_id: self._configs[user_id] for user_id in user_ids if user_id in self._configs}
+        missing = [user_id for user_id in user_ids if user_id not in cached]
+        if not missing:
+            return cached
+
+        loaded = await load_account_configs(missing)
+        with self._lock:
+            if self._tracking and self._generation == generation:
+                self._configs.update(loaded)
+        return {**cached, **loaded}
+
+    async def refresh(self, user_id):
+        """ Vuelve a cargar una cuenta que cambió. Devuelve su AccountConfig o None si ya no existe. """
+        self.invalidate(user_id)
+        return (await self.get_many([user_id])).get(int(user_id))
+
+
+account_config_store = AccountConfigStore()
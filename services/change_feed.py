@@ -0,0 +1,203 @@
+import asyncio
+import json
+import threading
+from config import Config
+from services.db_service import connect_db
+from services.account_config import account_config_store, source_group
+from services.scheduler import fetch_scheduler
+from services.keyword_matcher import keyword_matcher
+from services.credentials import credentials
+from services.rate_limiter import collected_limiter, posted_limiter
+
+ACCOUNT_CHANGES_CHANNEL = "account_changes"
+
+
+def forget_account(user_id):
+    """ La cuenta se eliminó: deja de recolectarse de inmediato. """
+    fetch_scheduler.remove_user(user_id)
+    keyword_matcher.remove_account(user_id)
+    account_config_store.invalidate(user_id)
+    collected_limiter.forget(user_id)
+    posted_limiter.forget(user_id)
+    print(f"🗑️ Cuenta {user_id} eliminada; se deja de recolectar.")
+
+
+def coalesce_changes(changes):
+    """
+    Agrupa los payloads de un mismo poll de notify_account_change() ({"table",
+    "op", "id"}) por (tabla, id) y luego por cuenta, para aplicar cada cuenta
+    una sola vez aunque se hayan editado varias filas. Devuelve
+    (cambiaron las api_keys, {user_id: (eliminada, cambiaron sus fuentes)}).
+    """
+    by_row = {}
+    for change in changes:
+        table = change.get("table")
+        if table == "api_keys":
+            by_row[(table, None)] = set()
+            continue
+        if change.get("id") is None:
+            continue
+        by_row.setdefault((table, int(change["id"])), set()).add(change.get("op"))
+
+    api_keys_changed = ("api_keys", None) in by_row
+    accounts = {}
+    for (table, user_id), ops in by_row.items():
+        if table == "api_keys":
+            continue
+        deleted, sources_changed = accounts.get(user_id, (False, False))
+        deleted = deleted or (table == "users" and "DELETE" in ops)
+        # Cuenta nueva o fuentes distintas: se recolecta ya, sin esperar su intervalo
+        sources_changed = sources_changed or table in ("monitored_users", "user_keywords") or (
+            table == "users" and "INSERT" in ops
+        )
+        accounts[user_id] = (deleted, sources_changed)
+    return api_keys_changed, accounts
+
+
+async def apply_account_change(user_id, deleted=False, sources_changed=False):
+    """ Actualiza el estado en memoria solo para la cuenta que cambió. """
+    if deleted:
+        forget_account(user_id)
+        return
+
+    account = await account_config_store.refresh(user_id)
+    if account is None:
+        forget_account(user_id)
+        return
+
+    collected_limiter.set_limit(user_id, account.rate_limit)
+    posted_limiter.set_limit(user_id, account.rate_limit)
+    if account.handles and account.keywords:
+        keyword_matcher.update_account(user_id, account.handles, account.keywords)
+    else:
+        keyword_matcher.remove_account(user_id)
+
+    if sources_changed:
+        fetch_scheduler.add_user(user_id, group=source_group(account))
+    else:
+        fetch_scheduler.set_group(user_id, source_group(account))
+
+
+class AccountChangeFeed:
+    """
+    Escucha el canal account_changes en una conexión dedicada (fuera del pool).
+    pg8000 solo lee las notificaciones al procesar una respuesta del servidor,
+    así que se hace un SELECT 1 cada poll_seconds y se vacía con.notifications.
+    Mientras está conectado, las cuentas no modificadas no se vuelven a consultar.
+    """
+
+    def __init__(self, channel, poll_seconds, reconnect_seconds, resync_seconds):
+        self.channel = channel
+        self.poll_seconds = poll_seconds
+        self.reconnect_seconds = reconnect_seconds
+        self.resync_seconds = resync_seconds
+
+        self._lock = threading.Lock()
+        self._connected = False
+        self._connections = 0
+        self._received = 0
+        self._applied = 0
+        self._errors = 0
+        self._default_refresh_seconds = None
+
+    def _connect(self):
+        con = connect_db()
+        con.run(f"LISTEN {self.channel}")
+        return con
+
+    def _poll(self, con):
+        con.run("SELECT 1")
+        changes = []
+        while con.notifications:
+            _, channel, payload = con.notifications.popleft()
+            if channel != self.channel:
+                continue
+            try:
+                changes.append(json.loads(payload))
+            except ValueError:
+                print(f"⚠ Notificación inválida en {self.channel}: {payload}")
+        return changes
+
+    def _on_connected(self):
+        account_config_store.track()
+        # Lo que cambió mientras no se escuchaba se recupera con una recarga completa;
+        # después la recarga periódica del planificador queda solo como respaldo
+        fetch_scheduler.request_users_refresh()
+        if self._default_refresh_seconds is None:
+            self._default_refresh_seconds = fetch_scheduler.users_refresh_seconds
+        fetch_scheduler.users_refresh_seconds = self.resync_seconds
+        with self._lock:
+            self._connected = True
+            self._connections += 1
+        print(f"📡 Escuchando cambios de cuentas en el canal {self.channel}.")
+
+    def _disconnect(self, con):
+        account_config_store.untrack()
+        if self._default_refresh_seconds is not None:
+            fetch_scheduler.users_refresh_seconds = self._default_refresh_seconds
+        with self._lock:
+            self._connected = False
+        try:
+            con.close()
+        except Exception:
+            pass
+
+    async def run(self, stop_event):
+        """ Aplica los cambios a medida que llegan hasta stop_event, reconectando si se pierde la conexión. """
+        con = None
+        try:
+            while not stop_event.is_set():
+                if con is None:
+                    try:
+                        con = await asyncio.to_thread(self._connect)
+                    except Exception as e:
+                        print(f"❌ No se pudo escuchar el canal {self.channel}: {e}")
+                        await asyncio.sleep(self.reconnect_seconds)
+                        continue
+                    self._on_connected()
+
+                try:
+                    changes = await asyncio.to_thread(self._poll, con)
+                except Exception as e:
+                    print(f"❌ Se perdió la conexión del canal {self.channel}: {e}")
+                    self._disconnect(con)
+                    con = None
+                    continue
+
+                with self._lock:
+                    self._received += len(changes)
+                api_keys_changed, accounts = coalesce_changes(changes)
+                if api_keys_changed:
+                    credentials.invalidate()
+                for user_id, (deleted, sources_changed) in accounts.items():
+                    with self._lock:
+                        self._applied += 1
+                    try:
+                        await apply_account_change(user_id, deleted, sources_changed)
+                    except Exception as e:
+                        with self._lock:
+                            self._errors += 1
+                        print(f"❌ Error al aplicar el cambio de la cuenta {user_id}: {e}")
+
+                await asyncio.sleep(self.poll_seconds)
+        finally:
+            if con is not None:
+                self._disconnect(con)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "connected": self._connected,
+                "connections": self._connections,
+                "received": self._received,
+                "applied": self._applied,
+                "errors": self._errors,
+            }
+
+
+account_change_feed = AccountChangeFeed(
+    ACCOUNT_CHANGES_CHANNEL,
+    Config.ACCOUNT_CHANGES_POLL_SECONDS,
+    Config.ACCOUNT_CHANGES_RECONNECT_SECONDS,
+    Config.ACCOUNT_CHANGES_RESYNC_SECONDS
+)
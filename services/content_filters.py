@@ -0,0 +1,181 @@
+import re
+import threading
+from collections import Counter, namedtuple
+from functools import lru_cache
+from config import Config
+from services.db_service import run_query, quote_literal
+from services.language_id import language_identifier, language_code
+
+# Configuración de filtros de una cuenta; las columnas NULL de account_filters usan el valor de Config
+FilterSettings = namedtuple(
+    "FilterSettings",
+    ["skip_retweets", "skip_replies", "skip_quotes", "min_length", "skip_url_only", "blocked_terms", "max_translated_length"]
+)
+FILTER_COLUMNS = FilterSettings._fields
+
+# Largo que Twitter asigna a cada enlace, sin importar la URL
+TWITTER_URL_LENGTH = 23
+URL_PATTERN = re.compile(r"https?://\S+")
+MENTION_PATTERN = re.compile(r"@\w+")
+
+# Largo relativo de un mismo texto en cada idioma (inglés = 1), para estimar el largo traducido
+LANGUAGE_EXPANSION = {"en": 1.0, "es": 1.2, "pt": 1.2, "fr": 1.25, "it": 1.2, "de": 1.3}
+
+
+def default_filter_settings():
+    return FilterSettings(
+        skip_retweets=Config.CONTENT_FILTER_SKIP_RETWEETS,
+        skip_replies=Config.CONTENT_FILTER_SKIP_REPLIES,
+        skip_quotes=Config.CONTENT_FILTER_SKIP_QUOTES,
+        min_length=Config.CONTENT_FILTER_MIN_LENGTH,
+        skip_url_only=Config.CONTENT_FILTER_SKIP_URL_ONLY,
+        blocked_terms=Config.CONTENT_FILTER_BLOCKED_TERMS,
+        max_translated_length=Config.CONTENT_FILTER_MAX_TRANSLATED_LENGTH,
+    )
+
+
+def filter_settings_from_row(values):
+    """ values sigue el orden de FILTER_COLUMNS; los NULL toman el valor por defecto. """
+    defaults = default_filter_settings()
+    settings = defaults._replace(**{
+        column: value for column, value in zip(FILTER_COLUMNS, values) if value is not None
+    })
+    return settings._replace(blocked_terms=tuple(term for term in settings.blocked_terms if term and term.strip()))
+
+
+def get_filter_settings(user_id):
+    """ Versión síncrona para las rutas de Flask. """
+    row = run_query(
+        f"SELECT {', '.join(FILTER_COLUMNS)} FROM account_filters WHERE user_id = {int(user_id)}",
+        fetchone=True
+    )
+    return filter_settings_from_row(row or [None] * len(FILTER_COLUMNS))
+
+
+def save_filter_settings(user_id, values):
+    """
+    Guarda los filtros indicados (None vuelve al valor por defecto) y devuelve
+    la configuración resultante, o None si no se pudo guardar.
+    """
+    literals = []
+    for column in FILTER_COLUMNS:
+        value = values.get(column)
+        if value is None:
+            literals.append("NULL")
+        elif column == "blocked_terms":
+            literals.append(f"ARRAY[{', '.join(quote_literal(term) for term in value)}]::text[]")
+        elif isinstance(value, bool):
+            literals.append("TRUE" if value else "FALSE")
+        else:
+            literals.append(str(int(value)))
+
+    saved = run_query(f"""
+    INSERT INTO account_filters (user_id, {', '.join(FILTER_COLUMNS)}, updated_at)
+    VALUES ({int(user_id)}, {', '.join(literals)}, NOW())
+    ON CONFLICT (user_id) DO UPDATE SET
+    {', '.join(f"{column} = EXCLUDED.{column}" for column in FILTER_COLUMNS)}, updated_at = NOW()
+    RETURNING user_id
+    """, fetchone=True)
+    if not saved:
+        return None
+    return get_filter_settings(user_id)
+
+
+@lru_cache(maxsize=256)
+def blocked_terms_pattern(terms):
+    """ Una sola expresión regular para todos los términos bloqueados de una cuenta. """
+    if not terms:
+        return None
+    alternatives = "|".join(re.escape(term.strip().lower()) for term in sorted(terms, key=len, reverse=True))
+    return re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+
+
+def is_retweet(tweet):
+    return bool(tweet.get("retweeted_status")) or (tweet.get("full_text") or "").startswith("RT @")
+
+
+def is_reply(tweet):
+    """ Respuestas a otras cuentas; los hilos del propio autor no cuentan. """
+    if not tweet.get("in_reply_to_status_id_str"):
+        return False
+    author_id = (tweet.get("user") or {}).get("id_str")
+    return not author_id or tweet.get("in_reply_to_user_id_str") != author_id
+
+
+def text_body(text):
+    """ Texto sin enlaces ni menciones. """
+    return MENTION_PATTERN.sub(" ", URL_PATTERN.sub(" ", text)).strip()
+
+
+def predicted_length(tweet, target_code):
+    """ Largo estimado del tweet traducido, contando cada enlace como lo cuenta Twitter. """
+    text = tweet.get("full_text") or ""
+    urls = URL_PATTERN.findall(text)
+    body = URL_PATTERN.sub("", text)
+    source_code, _ = language_identifier.detect(tweet)
+    ratio = 1.0
+    if target_code and source_code and source_code != target_code:
+        ratio = LANGUAGE_EXPANSION.get(target_code, 1.0) / LANGUAGE_EXPANSION.get(source_code, 1.0)
+    return int(len(body) * ratio) + TWITTER_URL_LENGTH * len(urls)
+
+
+class ContentFilter:
+    """
+    Filtros por cuenta que se aplican a una página completa antes de consultar
+    la base y de traducir: retweets, respuestas, citas, textos cortos o solo
+    enlaces, términos bloqueados y tweets que excederían 280 caracteres al
+    traducirse. Lleva la cuenta de los tweets descartados por cada filtro.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._dropped = Counter()
+        self._checked = 0
+
+    def reason(self, tweet, settings, target_code, blocked):
+        """ Nombre del primer filtro que descarta el tweet, o None si pasa todos. """
+        text = tweet.get("full_text") or ""
+        if settings.skip_retweets and is_retweet(tweet):
+            return "retweet"
+        if settings.skip_replies and is_reply(tweet):
+            return "reply"
+        if settings.skip_quotes and tweet.get("is_quote_status"):
+            return "quote"
+
+        body = text_body(text)
+        if settings.skip_url_only and not body and URL_PATTERN.search(text):
+            return "url_only"
+        if len(body) < settings.min_length:
+            return "min_length"
+        if blocked is not None and blocked.search(text.lower()):
+            return "blocked_term"
+        if settings.max_translated_length and predicted_length(tweet, target_code) > settings.max_translated_length:
+            return "translated_length"
+        return None
+
+    def apply(self, tweets, settings, target_language):
+        """ Devuelve (tweets que pasan, {filtro: [tweets descartados]}). """
+        target_code = language_code(target_language)
+        blocked = blocked_terms_pattern(settings.blocked_terms)
+
+        kept = []
+        dropped = {}
+        for tweet in tweets:
+            reason = self.reason(tweet, settings, target_code, blocked)
+            if reason is None:
+                kept.append(tweet)
+            else:
+                dropped.setdefault(reason, []).append(tweet)
+
+        with self._lock:
+            self._checked += len(tweets)
+            for reason, reason_tweets in dropped.items():
+                self._dropped[reason] += len(reason_tweets)
+        return kept, dropped
+
+    def stats(self):
+        with self._lock:
+            return {"checked": self._checked, "dropped": dict(self._dropped)}
+
+
+content_filter = ContentFilter()
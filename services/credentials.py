@@ -0,0 +1,68 @@
+import threading
+import time
+from config import Config
+from services.db_service import run_query, run_query_async
+
+# Filas de la tabla api_keys
+API_KEY_IDS = {"openai": 1, "socialdata": 2, "rapidapi": 3}
+
+
+class CredentialsCache:
+    """
+    Caché con TTL de las API keys guardadas en api_keys. Al vencer (o tras
+    invalidate) se recargan las tres claves con una sola consulta; así las
+    traducciones, búsquedas y publicaciones no consultan la base por cada
+    llamada y una clave actualizada desde la web se usa de inmediato.
+    """
+
+    def __init__(self, ttl_seconds):
+        self.ttl_seconds = ttl_seconds
+        self._keys = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _load_query(self):
+        return f"SELECT id, key FROM api_keys WHERE id IN ({', '.join(str(key_id) for key_id in API_KEY_IDS.values())})"
+
+    def _store(self, rows):
+        names = {key_id: name for name, key_id in API_KEY_IDS.items()}
+        with self._lock:
+            self._keys = {names[key_id]: key for key_id, key in rows if key_id in names}
+            self._loaded_at = time.monotonic()
+
+    def _cached(self, name):
+        """ Devuelve (encontrada, clave) si la caché está vigente. """
+        with self._lock:
+            if self._loaded_at is None or time.monotonic() - self._loaded_at >= self.ttl_seconds:
+                return False, None
+            return True, self._keys.get(name)
+
+    def get(self, name):
+        """ Versión síncrona para las rutas de Flask. """
+        found, key = self._cached(name)
+        if found:
+            return key
+        rows = run_query(self._load_query(), fetchall=True)
+        # Si la consulta falla no se cachea nada: el próximo pedido vuelve a intentar
+        if rows is None:
+            return None
+        self._store(rows)
+        return self._cached(name)[1]
+
+    async def get_async(self, name):
+        found, key = self._cached(name)
+        if found:
+            return key
+        rows = await run_query_async(self._load_query(), fetchall=True)
+        if rows is None:
+            return None
+        self._store(rows)
+        return self._cached(name)[1]
+
+    def invalidate(self):
+        with self._lock:
+            self._keys = {}
+            self._loaded_at = None
+
+
+credentials = CredentialsCache(Config.API_KEYS_CACHE_TTL_SECONDS)
@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import deque
+
+
+class ConnectionPool:
+    """
+    Pool de conexiones thread-safe con tamaño mínimo/máximo, verificación de
+    salud al entregar una conexión que estuvo inactiva y descarte de las
+    conexiones ociosas que exceden el mínimo.
+    """
+
+    def __init__(self, connect, min_size, max_size, max_idle_seconds, health_check_after_seconds, checkout_timeout):
+        self.connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_after_seconds = health_check_after_seconds
+        self.checkout_timeout = checkout_timeout
+
+        self._idle = deque()
+        self._size = 0
+        self._in_use = 0
+        self._condition = threading.Condition()
+
+        self._checkouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._created = 0
+        self._evicted = 0
+        self._failed_health_checks = 0
+
+    def _evict_idle(self):
+        """ Cierra las conexiones ociosas vencidas, respetando el tamaño mínimo. Requiere el lock. """
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.max_idle_seconds:
+                break
+            self._idle.popleft()
+            self._size -= 1
+            self._evicted += 1
+            self._close(conn)
+
+    def _close(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn):
+        try:
+            conn.run("SELECT 1")
+            return True
+        except Exception:
+            return False
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+
+        while True:
+            conn = None
+            last_used = None
+            create = False
+
+            with self._condition:
+                self._evict_idle()
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError("No hay conexiones disponibles en el pool de la base de datos")
+                    waited = True
+                    self._condition.wait(remaining)
+
+                if self._idle:
+                    # LIFO: la conexión usada más recientemente es la que menos probablemente esté caída
+                    conn, last_used = self._idle.pop()
+                else:
+                    self._size += 1
+                    create = True
+                self._in_use += 1
+
+            if create:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    self._discard()
+                    raise
+            elif time.monotonic() - last_used >= self.health_check_after_seconds and not self._is_healthy(conn):
+                self._close(conn)
+                self._discard(failed_health_check=True)
+                continue
+
+            self._record_checkout(time.monotonic() - started, waited, create)
+            return conn
+
+    def _discard(self, failed_health_check=False):
+        with self._condition:
+            self._size -= 1
+            self._in_use -= 1
+            if failed_health_check:
+                self._failed_health_checks += 1
+            self._condition.notify()
+
+    def _record_checkout(self, wait_time, waited, created):
+        with self._condition:
+            self._checkouts += 1
+            if created:
+                self._created += 1
+            if waited:
+                self._waits += 1
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+
+    def release(self, conn, broken=False):
+        if broken:
+            self._close(conn)
+            self._discard()
+            return
+
+        with self._condition:
+            self._in_use -= 1
+            self._idle.append((conn, time.monotonic()))
+            self._evict_idle()
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "avg_wait_ms": round(self._total_wait / self._checkouts * 1000, 2) if self._checkouts else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 2),
+                "created": self._created,
+                "evicted": self._evicted,
+                "failed_health_checks": self._failed_health_checks,
+            }
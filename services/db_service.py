@@ -1,51 +1,127 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
 import pg8000.native as pg
 from flask import g
 from config import Config
-from openai import OpenAI
+from services.db_pool import ConnectionPool
+from services.openai_client import create_chat_completion
 
+TRANSLATION_MODEL = "gpt-4o-mini"
+# Presupuesto aproximado de tokens de entrada por solicitud de traducción en lote
+TRANSLATION_BATCH_MAX_TOKENS = 1500
+
+
+async def get_openai_api_key():
+    # Importación diferida: credentials depende de las funciones de consulta de este módulo
+    from services.credentials import credentials
+    return await credentials.get_async("openai")
+
+def connect_db():
+    return pg.Connection(
+        user=Config.DB_USER,
+        password=Config.DB_PASSWORD,
+        host=Config.DB_HOST,
+        port=int(Config.DB_PORT),
+        database=Config.DB_NAME
+    )
+
+
+db_pool = ConnectionPool(
+    connect_db,
+    min_size=Config.DB_POOL_MIN_SIZE,
+    max_size=Config.DB_POOL_MAX_SIZE,
+    max_idle_seconds=Config.DB_POOL_MAX_IDLE_SECONDS,
+    health_check_after_seconds=Config.DB_POOL_HEALTH_CHECK_SECONDS,
+    checkout_timeout=Config.DB_POOL_CHECKOUT_TIMEOUT
+)
 
-def get_openai_api_key():
-    query = "SELECT key FROM api_keys WHERE id = 1"
-    result = run_query(query, fetchone=True)
-    return result[0] if result else None  
 
 def get_db():
     if 'db' not in g:
-        g.db = pg.Connection(
-            user=Config.DB_USER,
-            password=Config.DB_PASSWORD,
-            host=Config.DB_HOST,
-            port=int(Config.DB_PORT),
-            database=Config.DB_NAME
-        )
+        g.db = db_pool.acquire()
     return g.db
 
 
 def close_db(e=None):
     db = g.pop('db', None)
     if db is not None:
-        db.close()
+        db_pool.release(db)
+
+
+def execute_query(db, query, params=None, fetchone=False, fetchall=False):
+    if params is None:
+        params = ()
+
+    # Los parámetros con nombre (:nombre) se pasan como diccionario
+    if isinstance(params, dict):
+        result = db.run(query, **params)
+    else:
+        result = db.run(query, params)
+
+    if fetchone:
+        return result[0] if result else None
+    if fetchall:
+        return result
+
+    return None
+
+
+def quote_literal(value):
+    """ Convierte un valor en un literal SQL, escapando las comillas simples. """
+    if value is None:
+        return "NULL"
+    return "'" + str(value).replace("'", "''") + "'"
 
 
 def run_query(query, params=None, fetchone=False, fetchall=False):
     db = get_db()
 
-    if params is None:
-        params = ()
-    
     try:
-        result = db.run(query, params)
+        return execute_query(db, query, params, fetchone, fetchall)
+    except pg.InterfaceError as e:
+        # Conexión rota: se descarta del pool en lugar de devolverla
+        print(f"❌ Conexión a la base de datos perdida: {str(e)}")
+        db_pool.release(g.pop('db'), broken=True)
+        return None
+    except Exception as e:
+        print(f"❌ Error en consulta SQL: {str(e)}")
+        return None
+
 
-        if fetchone:
-            return result[0] if result else None
-        if fetchall:
-            return result
+# Acceso no bloqueante para los event loops del recolector y del publicador:
+# las consultas se ejecutan en hilos del executor que toman una conexión del
+# pool, así las tareas de distintos usuarios pueden tener consultas en curso
+# al mismo tiempo.
+_db_executor = ThreadPoolExecutor(max_workers=Config.DB_ASYNC_WORKERS, thread_name_prefix="db-worker")
+
+
+def _run_query_in_worker(query, params, fetchone, fetchall):
+    try:
+        db = db_pool.acquire()
+    except Exception as e:
+        print(f"❌ No se pudo obtener una conexión a la base de datos: {str(e)}")
+        return None
 
+    try:
+        result = execute_query(db, query, params, fetchone, fetchall)
+    except pg.InterfaceError as e:
+        print(f"❌ Conexión a la base de datos perdida: {str(e)}")
+        db_pool.release(db, broken=True)
         return None
     except Exception as e:
+        db_pool.release(db)
         print(f"❌ Error en consulta SQL: {str(e)}")
         return None
 
+    db_pool.release(db)
+    return result
+
+
+async def run_query_async(query, params=None, fetchone=False, fetchall=False):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_db_executor, _run_query_in_worker, query, params, fetchone, fetchall)
+
 
 def log_event(user_id, event_type, description):
     query = f"""
@@ -55,18 +131,29 @@ def log_event(user_id, event_type, description):
     run_query(query)
 
 
-def translate_text_with_openai(text, target_language, custom_style):
-    api_key = get_openai_api_key()
+async def log_event_async(user_id, event_type, description):
+    query = f"""
+    INSERT INTO logs (user_id, event_type, event_description)
+    VALUES ('{user_id}', '{event_type}', '{description}')
+    """
+    await run_query_async(query)
+
+
+async def translate_text_with_openai(text, target_language, custom_style, api_key=None, restyle=False):
+    """ Con restyle, el texto ya está en target_language y solo se le aplica el estilo personalizado. """
+    api_key = api_key or await get_openai_api_key()
     if not api_key:
         print("❌ No se pudo obtener la API Key de OpenAI.")
         return None
 
-    client = OpenAI(api_key=api_key)
-
-    prompt = f"Translate the following text (not the usernames (@)) into only this language: {target_language}: '{text}'. {custom_style}. Focus solely on the general message without adding irrelevant or distracting details or text. NEVER add a text that is not a translation of the original text example: 'Sure! Here’s the translation:'"
+    if restyle:
+        prompt = f"Rewrite the following text (not the usernames (@)), which is already in {target_language}, keeping it in only this language: {target_language}: '{text}'. Only apply this style. {custom_style}. Keep the same general message without adding irrelevant or distracting details or text. NEVER add a text that is not a rewrite of the original text example: 'Sure! Here’s the rewritten text:'"
+    else:
+        prompt = f"Translate the following text (not the usernames (@)) into only this language: {target_language}: '{text}'. {custom_style}. Focus solely on the general message without adding irrelevant or distracting details or text. NEVER add a text that is not a translation of the original text example: 'Sure! Here’s the translation:'"
     try:
-        response = client.chat.completions.create(
-            model="gpt-4o-mini", 
+        response = await create_chat_completion(
+            api_key,
+            model=TRANSLATION_MODEL, 
             messages=[
                 {"role": "system", "content": "Eres un traductor experto."},
                 {"role": "user", "content": f"{prompt}"}
@@ -79,43 +166,156 @@ def translate_text_with_openai(text, target_language, custom_style):
     except Exception as e:
         print(f"❌ Error al traducir con OpenAI: {str(e)}")
         return None
-    
-    
-def save_collected_tweet(user_id, source_type, source_value, tweet_id, tweet_text, created_at):
-    check_query = f"SELECT 1 FROM collected_tweets WHERE tweet_id = '{tweet_id}' LIMIT 1"
-    existing_tweet = run_query(check_query, fetchone=True)
-    if existing_tweet:
-        print(f"⚠ Tweet {tweet_id} ya existe. No se guardará.")
-        return  
-
-    language_query = f"SELECT language, custom_style FROM users WHERE id = {user_id}"
-    user_language = run_query(language_query, fetchone=True)
-    if not user_language:
-        print(f"❌ No se encontró el idioma para el usuario {user_id}.")
-        return
-
-    target_language = user_language[0] 
-    if len(user_language[1]) > 0:
-        custom_style = f'Custom Style: {user_language[1]}'
-    else:
-        custom_style = ''
-    
-    translated_text = translate_text_with_openai(tweet_text, target_language, custom_style)
-    if not translated_text:
-        print(f"❌ No se pudo traducir el tweet {tweet_id}. No se guardará.")
-        return
-
-    print(f"🌐 Tweet traducido al idioma '{target_language}': {translated_text}")
-
-    insert_query = f"""
-    INSERT INTO collected_tweets (user_id, source_type, source_value, tweet_id, tweet_text, created_at)
-    VALUES ({user_id if user_id is not None else 'NULL'}, 
-            '{source_type}', 
-            '{source_value}', 
-            '{tweet_id}', 
-            '{translated_text.replace("'", "''")}', 
-            '{created_at}')
+
+
+
+def estimate_tokens(text):
+    """ Estimación rápida de tokens (~4 caracteres por token). """
+    return len(text) // 4 + 1
+
+
+def chunk_translation_items(items, max_tokens=TRANSLATION_BATCH_MAX_TOKENS):
+    """
+    Agrupa los items (tweet_id, texto) en bloques cuyo tamaño estimado
+    en tokens no supere max_tokens.
+    """
+    chunks = []
+    current = []
+    current_tokens = 0
+    for tweet_id, text in items:
+        tokens = estimate_tokens(text)
+        if current and current_tokens + tokens > max_tokens:
+            chunks.append(current)
+            current = []
+            current_tokens = 0
+        current.append((tweet_id, text))
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_batch_translation_prompt(chunk, target_language, custom_style, restyle=False):
+    payload = json.dumps([{"id": str(tweet_id), "text": text} for tweet_id, text in chunk], ensure_ascii=False)
+    if restyle:
+        return (
+            f"Rewrite each of the following texts (not the usernames (@)), which are already in {target_language}, "
+            f"keeping them in only this language: {target_language}. Only apply this style. {custom_style}. "
+            "Keep the same general message without adding irrelevant or distracting details or text. "
+            "NEVER add a text that is not a rewrite of the original text example: 'Sure! Here’s the rewritten text:'. "
+            'Reply ONLY with a JSON object like {"translations": [{"id": "<id>", "text": "<rewritten text>"}]} '
+            f"with exactly one entry for every input id. Texts: {payload}"
+        )
+    return (
+        f"Translate each of the following texts (not the usernames (@)) into only this language: {target_language}. {custom_style}. "
+        "Focus solely on the general message without adding irrelevant or distracting details or text. "
+        "NEVER add a text that is not a translation of the original text example: 'Sure! Here’s the translation:'. "
+        'Reply ONLY with a JSON object like {"translations": [{"id": "<id>", "text": "<translation>"}]} '
+        f"with exactly one entry for every input id. Texts: {payload}"
+    )
+
+
+def parse_batch_translation(content, chunk):
+    """
+    Devuelve {tweet_id: traducción} con los items que se pudieron interpretar.
+    Los ids que falten o tengan un texto vacío quedan fuera del resultado.
+    """
+    ids = {str(tweet_id): tweet_id for tweet_id, _ in chunk}
+    try:
+        data = json.loads(content)
+    except (TypeError, ValueError):
+        return {}
+
+    entries = data.get("translations", []) if isinstance(data, dict) else data
+    if not isinstance(entries, list):
+        return {}
+
+    translations = {}
+    for entry in entries:
+        if not isinstance(entry, dict):
+            continue
+        tweet_id = ids.get(str(entry.get("id")))
+        text = entry.get("text")
+        if tweet_id is not None and isinstance(text, str) and text.strip():
+            translations[tweet_id] = text.strip()
+    return translations
+
+
+async def translate_chunk_with_openai(api_key, chunk, target_language, custom_style, restyle=False):
+    """
+    Devuelve {tweet_id: traducción} con lo que se pudo interpretar de la respuesta,
+    o None si la solicitud misma falló (429, timeout, error de conexión...).
+    """
+    prompt = build_batch_translation_prompt(chunk, target_language, custom_style, restyle)
+    try:
+        response = await create_chat_completion(
+            api_key,
+            model=TRANSLATION_MODEL,
+            messages=[
+                {"role": "system", "content": "Eres un traductor experto."},
+                {"role": "user", "content": prompt}
+            ],
+            response_format={"type": "json_object"},
+            max_tokens=sum(estimate_tokens(text) for _, text in chunk) * 2 + 100,
+            temperature=0.5
+        )
+        return parse_batch_translation(response.choices[0].message.content, chunk)
+    except Exception as e:
+        print(f"❌ Error al traducir en lote con OpenAI: {str(e)}")
+        return None
+
+
+async def translate_texts_with_openai(items, target_language, custom_style, restyle=False):
     """
-    run_query(insert_query)
-    print(f"✅ Tweet {tweet_id} guardado correctamente.")
+    Traduce varios tweets con una sola solicitud por bloque.
+    items es una lista de (tweet_id, texto); devuelve {tweet_id: traducción}.
+    Solo los tweets cuya respuesta no se pudo interpretar se traducen
+    de forma individual con translate_text_with_openai; si la solicitud de un
+    bloque falló, sus tweets quedan sin traducir y se reintentan en el próximo
+    ciclo (el cursor de búsqueda no los pasa por alto). Con restyle, los
+    textos ya están en target_language y solo se les aplica custom_style.
+    """
+    if not items:
+        return {}
+
+    api_key = await get_openai_api_key()
+    if not api_key:
+        print("❌ No se pudo obtener la API Key de OpenAI.")
+        return {}
+
+    if len(items) == 1:
+        tweet_id, text = items[0]
+        translated_text = await translate_text_with_openai(text, target_language, custom_style, api_key, restyle)
+        return {tweet_id: translated_text} if translated_text else {}
+
+    translations = {}
+    chunks = chunk_translation_items(items)
+    chunk_results = await asyncio.gather(*[
+        translate_chunk_with_openai(api_key, chunk, target_language, custom_style, restyle)
+        for chunk in chunks
+    ])
+    # Reintentar uno por uno durante una caída de OpenAI solo multiplicaría las solicitudes
+    deferred = set()
+    for chunk, result in zip(chunks, chunk_results):
+        if result is None:
+            deferred.update(tweet_id for tweet_id, _ in chunk)
+        else:
+            translations.update(result)
+    if deferred:
+        print(f"⏳ {len(deferred)} tweets quedan sin traducir hasta el próximo ciclo porque falló la solicitud en lote.")
+
+    failed = [
+        (tweet_id, text) for tweet_id, text in items
+        if tweet_id not in translations and tweet_id not in deferred
+    ]
+    if failed:
+        print(f"⚠ Traducción en lote inválida para {len(failed)} tweets. Traduciendo individualmente...")
+        results = await asyncio.gather(*[
+            translate_text_with_openai(text, target_language, custom_style, api_key, restyle)
+            for _, text in failed
+        ])
+        for (tweet_id, _), translated_text in zip(failed, results):
+            if translated_text:
+                translations[tweet_id] = translated_text
 
+    return translations
@@ -0,0 +1,82 @@
+import hashlib
+import threading
+from services.db_service import run_query_async, quote_literal
+
+
+def query_key(query):
+    return hashlib.sha1(query.encode("utf-8")).hexdigest()
+
+
+def source_key(handle, keywords):
+    """
+    Identidad estable de una fuente de una cuenta: un usuario monitoreado y el
+    conjunto de keywords de la cuenta. No depende de cómo se agrupen las cuentas
+    ni de cómo se divida la consulta, así que el cursor sobrevive a los cambios
+    de lote; si cambian las keywords, la fuente es otra y empieza sin cursor.
+    """
+    terms = sorted({keyword.strip().lower() for keyword in keywords if keyword and keyword.strip()})
+    return query_key(f"from:{handle.lower()} {' '.join(terms)}")
+
+
+class FetchCursorStore:
+    """
+    Marca de agua (id_str más alto ya procesado) por cuenta (scope) y fuente
+    (source_key). Se persiste en fetch_cursors para sobrevivir a los reinicios
+    del recolector y se usa como since_id para que SocialData devuelva solo
+    tweets nuevos.
+    """
+
+    def __init__(self):
+        self._cursors = {}
+        self._lock = threading.Lock()
+
+    async def load(self):
+        rows = await run_query_async("SELECT scope, query_key, since_id FROM fetch_cursors", fetchall=True) or []
+        with self._lock:
+            self._cursors = {(scope, key): int(since_id) for scope, key, since_id in rows}
+        print(f"📍 {len(rows)} cursores de búsqueda cargados.")
+
+    def since_id(self, sources):
+        """
+        Cursor de una consulta que cubre varias fuentes [(scope, source_key)]:
+        el menor de todos, para que ninguna fuente se pierda tweets. Si alguna
+        todavía no tiene cursor, se busca sin since_id.
+        """
+        with self._lock:
+            cursors = [self._cursors.get((str(scope), key)) for scope, key in sources]
+        if not cursors or None in cursors:
+            return None
+        return min(cursors)
+
+    def apply(self, query, sources):
+        """ Agrega since_id a la consulta si todas sus fuentes tienen cursor. """
+        since_id = self.since_id(sources)
+        return f"{query} since_id:{since_id}" if since_id else query
+
+    async def advance(self, updates):
+        """ Avanza los cursores {(scope, source_key): tweet_id}; nunca retroceden. """
+        advanced = {}
+        with self._lock:
+            for (scope, key), tweet_id in updates.items():
+                current = self._cursors.get((str(scope), key))
+                if current is not None and tweet_id <= current:
+                    continue
+                self._cursors[(str(scope), key)] = tweet_id
+                advanced[(str(scope), key)] = tweet_id
+        if not advanced:
+            return
+
+        values = ", ".join(
+            f"({quote_literal(scope)}, {quote_literal(key)}, {int(tweet_id)}, NOW())"
+            for (scope, key), tweet_id in advanced.items()
+        )
+        upsert_query = f"""
+        INSERT INTO fetch_cursors (scope, query_key, since_id, updated_at)
+        VALUES {values}
+        ON CONFLICT (scope, query_key) DO UPDATE
+        SET since_id = GREATEST(fetch_cursors.since_id, EXCLUDED.since_id), updated_at = NOW()
+        """
+        await run_query_async(upsert_query)
+
+
+fetch_cursor_store = FetchCursorStore()
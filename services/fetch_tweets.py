@@ -1,222 +1,128 @@
 import asyncio
-import aiohttp
-from services.db_service import run_query, save_collected_tweet, log_event
+import re
+from services.db_service import run_query_async, log_event_async
+from services.ingest import ingest_tweets
+from services.seen_tweets import seen_tweet_index
+from services.fetch_cursors import fetch_cursor_store, source_key
+from services.query_planner import plan_queries, merge_results
+from services.keyword_matcher import keyword_matcher
+from services.rate_limiter import collected_limiter, posted_limiter
+from services.outbound_limiter import outbound_limiters
+from services.posted_hashes import posted_hash_index, RESERVE_FAILED
+from services.credentials import credentials
+from services.http_session import get_http_session
+from services.account_config import load_account_configs, account_config_store, source_group
+from services.post_queue import (
+    enqueue_collected_tweets, purge_orphaned_entries, claim_due_posts,
+    complete_post, mark_duplicate, fail_post, review_post, release_posts
+)
 from config import Config
 from datetime import datetime, timezone
-from services.post_tweets import post_tweet
+from services.post_tweets import post_tweet, post_tweet_async
 
 SOCIALDATA_API_URL = "https://api.socialdata.tools/twitter/search"
+QUERY_HANDLE_PATTERN = re.compile(r"from:(\w+)")
 TWEET_LIMIT_PER_HOUR = 10
 
-def get_socialdata_api_key():
-    query = "SELECT key FROM api_keys WHERE id = 2"  
-    result = run_query(query, fetchone=True)
-    return result[0] if result else None 
-
-async def get_tweet_limit_per_hour(user_id):
-    query = f"SELECT rate_limit FROM users WHERE id = {user_id}"
-    result = run_query(query, fetchone=True)
-    return result[0] if result else 10 
-
-async def count_tweets_for_user(user_id):
-    query = f"""
-    SELECT COUNT(*) FROM collected_tweets 
-    WHERE user_id = {user_id}
-    AND created_at >= NOW() - INTERVAL '1 hour'
-    """
-    result = run_query(query, fetchone=True)
-    return result[0] if result else 0
+async def get_socialdata_api_key():
+    return await credentials.get_async("socialdata")
 
-async def fetch_tweets_for_user(session, user_id, username, limit, fetching_event):
+async def search_socialdata(session, headers, query, sources):
     """
-    Función asíncrona para buscar tweets de un usuario monitoreado.
-    Se detiene si el evento fetching_event está activado.
+    Ejecuta una búsqueda "Latest" a partir del cursor de sus fuentes [(scope, source_key)].
+    Si la búsqueda falla devuelve una lista vacía para no afectar al resto de los shards.
     """
-    # Verificar si el proceso debe detenerse
-    if fetching_event.is_set():
-        print(f"⏹️ Proceso detenido para usuario monitoreado: {username}.")
-        return
-
-    # Contar tweets recolectados hoy
-    tweets_collected_today = await count_tweets_for_user(user_id)
-    if tweets_collected_today >= TWEET_LIMIT_PER_HOUR:
-        print(f"⛔ Usuario {user_id} alcanzó el límite de {TWEET_LIMIT_PER_HOUR} tweets hoy. Saltando usuario {username}.")
-        return
-
-    print(f"📡 Buscando tweets de usuario monitoreado: {username}")
-    headers = {"Authorization": f"Bearer {Config.SOCIALDATA_API_KEY}"}
-    params = {"query": f"from:{username}", "type": "Latest"}
-
-    try:
-        async with session.get(SOCIALDATA_API_URL, headers=headers, params=params) as response:
-            data = await response.json()
-            tweets = data.get("tweets", [])[:limit]
-
-            for tweet in tweets:
-                # Verificar nuevamente si el proceso debe detenerse
-                if fetching_event.is_set():
-                    print(f"⏹️ Proceso detenido mientras se procesaban tweets de {username}.")
-                    break
-
-                # Contar tweets recolectados hoy
-                tweets_collected_today = await count_tweets_for_user(user_id)
-                if tweets_collected_today >= TWEET_LIMIT_PER_HOUR:
-                    print(f"⛔ Usuario {user_id} alcanzó el límite mientras recolectaba. Deteniendo usuario {username}.")
-                    break
-
-                # Extraer datos del tweet
-                tweet_id = tweet["id_str"]
-                tweet_text = tweet["full_text"]
-                created_at = tweet["tweet_created_at"]
-
-                print(f"✅ Nuevo tweet de {username}: {tweet_text[:50]}...")
-                save_collected_tweet(user_id, "username", username, tweet_id, tweet_text, created_at)
-                print(f"💾 Tweet guardado en la base de datos: {tweet_id}")
-
-                # # Publicar el tweet
-                # response, status_code = post_tweet(user_id, tweet_text)
-                # if status_code == 200:
-                #     # Si el tweet fue publicado exitosamente, eliminarlo de collected_tweets
-                #     delete_query = f"DELETE FROM collected_tweets WHERE tweet_id = '{tweet_id}' AND user_id = '{user_id}'"
-                #     run_query(delete_query)
-                #     print(f"🗑️ Tweet {tweet_id} eliminado de la base de datos después de ser publicado.")
-                # else:
-                #     print(f"❌ No se pudo publicar el tweet de {username}: {response.get('error')}")
-
-                # Pequeña pausa para evitar sobrecargar el sistema (opcional)
-                await asyncio.sleep(0.1)
-
-    except Exception as e:
-        log_event(user_id, "ERROR", f"Error obteniendo tweets de {username}: {str(e)}")
-        print(f"❌ Error con {username}: {e}")
-        
-async def fetch_tweets_for_keyword(session, user_id, keyword, limit, fetching_event):
-    if fetching_event.is_set():
-        print(f"⏹️ Proceso detenido para keyword: {keyword}.")
-        return
-
-    tweets_collected_today = await count_tweets_for_user(user_id)
-    if tweets_collected_today >= TWEET_LIMIT_PER_HOUR:
-        print(f"⛔ Usuario {user_id} alcanzó el límite de {TWEET_LIMIT_PER_HOUR} tweets hoy. Saltando keyword {keyword}.")
-        return
-
-    print(f"🔍 Buscando tweets con keyword: {keyword}")
-    headers = {"Authorization": f"Bearer {Config.SOCIALDATA_API_KEY}"}
-    params = {"query": keyword, "type": "Latest"}
-
-    try:
-        async with session.get(SOCIALDATA_API_URL, headers=headers, params=params) as response:
-            data = await response.json()
-            tweets = data.get("tweets", [])[:limit]
-
-            for tweet in tweets:
-                if fetching_event.is_set():
-                    print(f"⏹️ Proceso detenido mientras se procesaban tweets con keyword: {keyword}.")
-                    break
-
-                tweets_collected_today = await count_tweets_for_user(user_id)
-                if tweets_collected_today >= TWEET_LIMIT_PER_HOUR:
-                    print(f"⛔ Usuario {user_id} alcanzó el límite mientras recolectaba. Deteniendo keyword {keyword}.")
-                    break
-
-                tweet_id = tweet["id_str"]
-                tweet_text = tweet["full_text"]
-                created_at = tweet["tweet_created_at"]
-
-                print(f"✅ Nuevo tweet con keyword '{keyword}': {tweet_text[:50]}...")
-                save_collected_tweet(user_id, "keyword", keyword, tweet_id, tweet_text, created_at)
-                print(f"💾 Tweet guardado en la base de datos: {tweet_id}")
-
-                # response, status_code = post_tweet(user_id, tweet_text)
-                # if status_code == 201:
-                #     print(f"🗑️ Tweet {tweet_id} publicado.")
-                # else:
-                #     print(f"❌ No se pudo publicar el tweet con keyword '{keyword}': {response.get('error')}")
-
-                await asyncio.sleep(0.1)
-
-    except Exception as e:
-        log_event(user_id, "ERROR", f"Error obteniendo tweets con la keyword '{keyword}': {str(e)}")
-        print(f"❌ Error con la keyword '{keyword}': {e}")
-
-
-async def fetch_tweets_for_monitored_users_with_keywords(session, user_id, monitored_users, keywords, limit, fetching_event):
-    try:
-        if fetching_event.is_set():
-            print(f"⏹️ Proceso detenido para usuario ID: {user_id}.")
-            return
-        
-        TWEET_LIMIT_PER_HOUR = await get_tweet_limit_per_hour(user_id)
-
-        tweets_collected_today = await count_tweets_for_user(user_id)
-        if tweets_collected_today >= TWEET_LIMIT_PER_HOUR:
-            print(f"⛔ Usuario {user_id} alcanzó el límite de {TWEET_LIMIT_PER_HOUR} tweets. Saltando completamente la búsqueda.")
-            return
-
-        print(f"🔍 Buscando tweets para usuario ID: {user_id} con palabras clave específicas...")
-
-        query_parts = []
-        for username in monitored_users:
-            keyword_query = " OR ".join(keywords) 
-            query_parts.append(f"(from:{username} ({keyword_query}))")
-        full_query = " OR ".join(query_parts) 
-        
-        socialdata_api_key = get_socialdata_api_key()
-        if not socialdata_api_key:
-            print("❌ No se pudo obtener la API Key de SocialData.")
-            return
-
-        headers = {"Authorization": f"Bearer {socialdata_api_key}"}
-
-        # headers = {"Authorization": f"Bearer {Config.SOCIALDATA_API_KEY}"}
-        params = {"query": full_query, "type": "Latest"}
+    params = {"query": fetch_cursor_store.apply(query, sources), "type": "Latest"}
+    limiter = outbound_limiters["socialdata"]
+
+    attempt = 0
+    while True:
+        try:
+            async with limiter.slot():
+                async with session.get(SOCIALDATA_API_URL, headers=headers, params=params) as response:
+                    limiter.observe(response.headers)
+                    status = response.status
+                    retry_headers = response.headers
+                    if status == 200:
+                        data = await response.json()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"❌ Error en la búsqueda '{query[:80]}...': {e}")
+            return []
+
+        if status == 200:
+            break
+        # 429 y errores 5xx se reencolan; el cursor no avanza, así que nada se pierde
+        delay = limiter.retry_delay(attempt, retry_headers, status) if status == 429 or status >= 500 else None
+        if delay is None:
+            print(f"❌ SocialData respondió {status} para la consulta: {query[:80]}...")
+            return []
+        print(f"⏳ SocialData respondió {status}. Reintentando en {delay:.1f}s...")
+        attempt += 1
+        await asyncio.sleep(delay)
+
+    return data.get("tweets", [])
+
+async def run_planned_search(session, headers, handle_sources, keywords):
+    """
+    Ejecuta en paralelo los shards de la consulta factorizada y devuelve
+    los tweets combinados, sin duplicados y del más nuevo al más viejo.
+    handle_sources es {usuario monitoreado: [(scope, source_key)]}: cada shard
+    parte del menor cursor de las fuentes de sus usuarios.
+    """
+    queries = plan_queries(sorted(handle_sources), keywords)
+    print(f"🧩 Búsqueda dividida en {len(queries)} consultas ({len(handle_sources)} usuarios monitoreados).")
 
-        async with session.get(SOCIALDATA_API_URL, headers=headers, params=params) as response:
-            data = await response.json()
-            tweets = data.get("tweets", [])[:limit]
+    semaphore = asyncio.Semaphore(Config.SOCIALDATA_SHARD_CONCURRENCY)
 
-            for tweet in tweets:
-                if fetching_event.is_set():
-                    print(f"⏹️ Proceso detenido mientras se procesaban tweets.")
-                    break
+    async def run_shard(query):
+        sources = [
+            source for handle in QUERY_HANDLE_PATTERN.findall(query)
+            for source in handle_sources.get(handle.lower(), [])
+        ]
+        async with semaphore:
+            return await search_socialdata(session, headers, query, sources)
 
-                tweets_collected_today = await count_tweets_for_user(user_id)
-                if tweets_collected_today >= TWEET_LIMIT_PER_HOUR:
-                    print(f"⛔ Usuario {user_id} alcanzó el límite mientras recolectaba. Deteniendo la búsqueda.")
-                    break
+    results = await asyncio.gather(*[run_shard(query) for query in queries])
+    return merge_results(results)
 
-                tweet_id = tweet["id_str"]
-                tweet_text = tweet["full_text"]
-                created_at = tweet["tweet_created_at"]
 
-                print(f"✅ Nuevo tweet encontrado: {tweet_text[:50]}...")
-                save_collected_tweet(user_id, "combined", None, tweet_id, tweet_text, created_at)
-                print(f"💾 Tweet guardado en la base de datos: {tweet_id}")
+def handle_sources_for(account_sources):
+    """ {user_id: {handle: source_key}} → {handle: [(scope, source_key)]}, lo que usa run_planned_search. """
+    handle_sources = {}
+    for user_id, sources in account_sources.items():
+        for handle, key in sources.items():
+            handle_sources.setdefault(handle, []).append((str(user_id), key))
+    return handle_sources
 
-                # query = f"""
-                # SELECT tweet_text FROM collected_tweets WHERE tweet_id = '{tweet_id}' AND user_id = '{user_id}'                
-                # """
-                # result = run_query(query, fetchone=True)
 
-                # if result != 'None':
-                #     response, status_code = post_tweet(user_id, result)
-                
-                # if status_code == 200:
-                #     delete_query = f"DELETE FROM collected_tweets WHERE tweet_id = '{tweet_id}' AND user_id = '{user_id}'"
-                #     run_query(delete_query)
-                #     print(f"🗑️ Tweet {tweet_id} eliminado de la base de datos después de ser publicado.")
-                # else:
-                #     print(f"❌ No se pudo publicar el tweet {result}: {response.get('error')}")
+async def advance_processed_cursors(user_id, sources, assigned, found_tweets):
+    """
+    Avanza los cursores de una cuenta ({handle: source_key}) una vez ingeridos
+    sus tweets. Cada cursor llega hasta el id más alto recibido de su usuario
+    monitoreado que quede por debajo del primer tweet asignado que sigue sin
+    procesar (falló la traducción, quedó fuera de la página o del límite por
+    hora), así la próxima búsqueda lo vuelve a traer.
+    """
+    pending = {}
+    for tweet in seen_tweet_index.filter_unseen(user_id, assigned):
+        author = tweet_author(tweet)
+        pending[author] = min(pending.get(author, int(tweet["id_str"])), int(tweet["id_str"]))
+
+    updates = {}
+    for tweet in found_tweets:
+        author = tweet_author(tweet)
+        if author not in sources or not str(tweet.get("id_str", "")).isdigit():
+            continue
+        tweet_id = int(tweet["id_str"])
+        if author in pending and tweet_id >= pending[author]:
+            continue
+        key = (str(user_id), sources[author])
+        updates[key] = max(updates.get(key, 0), tweet_id)
+    await fetch_cursor_store.advance(updates)
 
-                await asyncio.sleep(0.1)
 
-    except asyncio.CancelledError:
-        print(f"⏹️ Tarea cancelada para usuario ID: {user_id}.")
-        raise 
-    except Exception as e:
-        log_event(user_id, "ERROR", f"Error obteniendo tweets: {str(e)}")
-        print(f"❌ Error al buscar tweets: {e}")
-        
 # async def fetch_tweets_for_single_user(user_id, fetching_event):
 #     """
 #     Función asíncrona para buscar tweets para un solo usuario.
@@ -277,67 +183,191 @@ async def fetch_tweets_for_monitored_users_with_keywords(session, user_id, monit
 #     print(f"✅ Búsqueda de tweets completada para usuario ID: {user_id}.")
 
 
-async def fetch_tweets_for_single_user(user_id, fetching_event):
-    print(f"🔍 Iniciando búsqueda de tweets para usuario ID: {user_id}...")
+def page_limit(account):
+    """ Máximo de tweets por página de resultados; el límite por hora lo aplica collected_limiter. """
+    return 11 if len(account.handles) > 3 else TWEET_LIMIT_PER_HOUR
 
-    if fetching_event.is_set():
-        print(f"⏹️ Proceso detenido para usuario ID: {user_id}.")
-        return
 
-    query_users = f"SELECT DISTINCT twitter_username FROM monitored_users WHERE user_id = '{user_id}'"
-    monitored_users = run_query(query_users, fetchall=True) or []
+def tweet_author(tweet):
+    return ((tweet.get("user") or {}).get("screen_name") or "").lower()
 
-    query_keywords = f"SELECT DISTINCT keyword FROM user_keywords WHERE user_id = '{user_id}'"
-    monitored_keywords = run_query(query_keywords, fetchall=True) or []
 
-    if not monitored_users or not monitored_keywords:
-        print(f"⚠ Usuario {user_id} no tiene usuarios o palabras clave monitoreadas.")
-        return
+def group_sources_by_keywords(accounts):
+    """
+    Agrupa las cuentas que comparten exactamente el mismo conjunto de keywords.
+    accounts es {user_id: AccountConfig}; devuelve
+    {keywords: {user_id: set(handles en minúsculas)}}.
+    """
+    groups = {}
+    for user_id, account in accounts.items():
+        key = tuple(sorted(set(account.keywords)))
+        groups.setdefault(key, {})[user_id] = {handle.lower() for handle in account.handles}
+    return groups
 
-    limit = 11 if len(monitored_users) > 3 else TWEET_LIMIT_PER_HOUR
 
-    async with aiohttp.ClientSession() as session:
-        await fetch_tweets_for_monitored_users_with_keywords(
-            session,
-            user_id,
-            [user[0] for user in monitored_users],
-            [keyword[0] for keyword in monitored_keywords],
-            limit,
-            fetching_event
-        )
+async def fetch_coalesced_group(session, headers, keywords, subscribers, accounts, fetching_event, sink=None):
+    """
+    Busca una sola vez los tweets de todos los usuarios monitoreados con este
+    conjunto de keywords y reparte cada tweet a las cuentas suscritas a su autor.
+    Devuelve {user_id: tweets insertados}.
+    """
+    # Cada cuenta conserva su propio cursor por fuente: la consulta compartida parte del menor
+    account_sources = {
+        user_id: {handle: source_key(handle, keywords) for handle in account_handles}
+        for user_id, account_handles in subscribers.items()
+    }
+    found_tweets = await run_planned_search(session, headers, handle_sources_for(account_sources), list(keywords))
+    if fetching_event.is_set() or not found_tweets:
+        return {}
+
+    per_account = {user_id: [] for user_id in subscribers}
+    for tweet in found_tweets:
+        author = tweet_author(tweet)
+        for user_id, account_handles in subscribers.items():
+            if author in account_handles:
+                per_account[user_id].append(tweet)
+
+    return await ingest_for_accounts(per_account, accounts, account_sources, found_tweets, sink)
+
+
+async def ingest_for_accounts(per_account, accounts, account_sources, found_tweets, sink=None):
+    """
+    Ingiere en paralelo los tweets asignados a cada cuenta ({user_id: AccountConfig})
+    respetando su página y su límite restante, y recién entonces avanza los
+    cursores de sus fuentes (account_sources). Devuelve {user_id: tweets insertados}.
+    Si se indica sink (modo pipeline), los tweets nuevos se le entregan en
+    lugar de ingerirse, junto con la función que avanza los cursores cuando
+    el pipeline termina con ellos, y se devuelve cuántos se entregaron.
+    """
+    async def ingest_for_account(user_id):
+        assigned = per_account.get(user_id, [])
+
+        async def advance_cursors():
+            await advance_processed_cursors(user_id, account_sources[user_id], assigned, found_tweets)
+
+        # Descartar los tweets ya ingeridos antes de cualquier consulta o traducción
+        account = accounts[user_id]
+        tweets = seen_tweet_index.filter_unseen(user_id, assigned)[:page_limit(account)]
+        if not tweets:
+            await advance_cursors()
+            return 0
+        print(f"✅ {len(tweets)} tweets nuevos para usuario ID: {user_id}.")
+        if sink is not None:
+            await sink(user_id, "combined", None, tweets, account, on_done=advance_cursors)
+            return len(tweets)
+        inserted = await ingest_tweets(user_id, "combined", None, tweets, collected_limiter.remaining(user_id), account)
+        await advance_cursors()
+        return inserted
+
+    user_ids = [user_id for user_id in account_sources if user_id in accounts]
+    inserted = await asyncio.gather(*[ingest_for_account(user_id) for user_id in user_ids])
+    return dict(zip(user_ids, inserted))
+
+
+async def fetch_timelines_and_match(session, headers, accounts, fetching_event, sink=None):
+    """
+    Modo "timeline": descarga una sola vez los tweets recientes de cada usuario
+    monitoreado y asigna cada tweet a sus cuentas buscando localmente las
+    keywords con el autómata de Aho-Corasick.
+    """
+    for user_id, account in accounts.items():
+        keyword_matcher.update_account(user_id, account.handles, account.keywords)
+
+    account_sources = {
+        user_id: {handle.lower(): source_key(handle, account.keywords) for handle in account.handles}
+        for user_id, account in accounts.items()
+    }
+    handle_sources = handle_sources_for(account_sources)
+
+    handles = sorted(handle_sources)
+    size = Config.TIMELINE_HANDLES_PER_QUERY
+    chunks = [handles[index:index + size] for index in range(0, len(handles), size)]
+    results = await asyncio.gather(*[
+        run_planned_search(session, headers, {handle: handle_sources[handle] for handle in chunk}, [])
+        for chunk in chunks
+    ])
+    if fetching_event.is_set():
+        return {}
 
-    print(f"✅ Búsqueda de tweets completada para usuario ID: {user_id}.")
-    
-    
-async def fetch_tweets_for_all_users(fetching_event):
-    print("🔍 Buscando tweets para cada usuario registrado (etapa 1)...")
+    found_tweets = merge_results(results)
+    per_account = keyword_matcher.match_batch(found_tweets)
+    return await ingest_for_accounts(per_account, accounts, account_sources, found_tweets, sink)
 
-    query = "SELECT DISTINCT id FROM users"
-    users = run_query(query, fetchall=True)
-    print(users)
 
-    if not users:
-        print("⚠ No hay usuarios registrados en la base de datos.")
-        return
+async def fetch_tweets_for_users(user_ids, fetching_event, sink=None, configs=None):
+    """
+    Ciclo de recolección coalescido: cada fuente distinta (usuarios monitoreados
+    + conjunto de keywords) se consulta una sola vez para todas las cuentas que
+    la comparten, respetando el límite por hora de cada cuenta.
+    configs es el snapshot {user_id: AccountConfig} del ciclo; si no se pasa,
+    se toma de account_config_store (una sola consulta para las cuentas que no
+    están en memoria).
+    Devuelve {user_id: tweets insertados} (o entregados a sink, ver ingest_for_accounts).
+    """
+    if configs is None:
+        configs = await account_config_store.get_many(user_ids)
 
-    tasks = []
-    for user_id in users:
+    accounts = {}
+    # Una sola carga de tweets de la última hora para todo el ciclo; los límites vienen del snapshot
+    await collected_limiter.seed(user_ids, {user_id: account.rate_limit for user_id, account in configs.items()})
+    for user_id in user_ids:
         if fetching_event.is_set():
             print("⏹️ Proceso detenido por solicitud de usuario.")
-            return
+            return {}
 
-        print(f"👤 Iniciando búsqueda de tweets para usuario ID: {user_id[0]}")
-        task = asyncio.create_task(fetch_tweets_for_single_user(user_id[0], fetching_event))
-        tasks.append(task)
+        account = configs.get(user_id)
+        if not account or not account.handles or not account.keywords:
+            print(f"⚠ Usuario {user_id} no tiene usuarios o palabras clave monitoreadas.")
+            continue
 
-        await asyncio.sleep(0.1)
+        if collected_limiter.remaining(user_id) <= 0:
+            print(f"⛔ Usuario {user_id} alcanzó el límite de {collected_limiter.limit(user_id)} tweets. Saltando completamente la búsqueda.")
+            continue
 
-    try:
-        await asyncio.gather(*tasks)
-    except asyncio.CancelledError:
-        print("⏹️ Tareas canceladas por solicitud de detención.")
+        accounts[user_id] = account
+
+    if not accounts:
+        return {}
+
+    socialdata_api_key = await get_socialdata_api_key()
+    if not socialdata_api_key:
+        print("❌ No se pudo obtener la API Key de SocialData.")
+        return {}
+
+    headers = {"Authorization": f"Bearer {socialdata_api_key}"}
+
+    results = {}
+    session = get_http_session()
+    if Config.FETCH_MODE == "timeline":
+        group_results = await asyncio.gather(
+            fetch_timelines_and_match(session, headers, accounts, fetching_event, sink),
+            return_exceptions=True
+        )
+    else:
+        groups = group_sources_by_keywords(accounts)
+        print(f"🔗 {len(accounts)} cuentas agrupadas en {len(groups)} fuentes distintas.")
+        group_results = await asyncio.gather(*[
+            fetch_coalesced_group(session, headers, keywords, subscribers, accounts, fetching_event, sink)
+            for keywords, subscribers in groups.items()
+        ], return_exceptions=True)
+
+    for group_result in group_results:
+        if isinstance(group_result, BaseException):
+            print(f"❌ Error al buscar tweets de una fuente compartida: {group_result}")
+            continue
+        for user_id, inserted in group_result.items():
+            results[user_id] = results.get(user_id, 0) + inserted
+    return results
+
+
+async def load_user_groups():
+    """
+    Cuentas a planificar con su fuente compartida: {user_id: grupo}. Las cuentas
+    del mismo grupo se despachan juntas para consultar la fuente una sola vez.
+    """
+    configs = await load_account_configs()
+    return {user_id: source_group(account) for user_id, account in configs.items()}
 
-    print("✅ Búsqueda de tweets completada.")
 
 def auto_post_tweet():
     """
@@ -360,13 +390,22 @@ async def post_tweets_for_all_users(posting_event):
     print("🚀 Iniciando publicación de tweets para cada usuario registrado...")
 
     query = "SELECT DISTINCT id FROM users"
-    users = run_query(query, fetchall=True)
+    users = await run_query_async(query, fetchall=True)
     print(users)
 
     if not users:
         print("⚠ No hay usuarios registrados en la base de datos.")
         return
 
+    # Pasar a la cola los tweets nuevos (repartidos en la hora) y limpiar los borrados
+    queued = await enqueue_collected_tweets()
+    await purge_orphaned_entries()
+    if queued:
+        print(f"📬 {queued} tweets nuevos en la cola de publicación.")
+
+    # Una sola carga de límites y publicaciones de la última hora para todo el ciclo
+    await posted_limiter.seed([user_id[0] for user_id in users])
+
     tasks = []
     for user_id in users:
         if posting_event.is_set():
@@ -394,26 +433,28 @@ async def post_tweets_for_single_user(user_id, posting_event):
         return
 
     # Verificar límite de tweets por hora
-    tweet_limit = await get_tweet_limit_per_hour(user_id)
-    tweets_posted_last_hour = await count_tweets_for_user(user_id)
-
-    if tweets_posted_last_hour >= tweet_limit:
-        print(f"⛔ Usuario {user_id} alcanzó el límite de {tweet_limit} tweets por hora. Saltando publicación.")
+    if posted_limiter.remaining(user_id) <= 0:
+        print(f"⛔ Usuario {user_id} alcanzó el límite de {posted_limiter.limit(user_id)} tweets por hora. Saltando publicación.")
         return
 
-    query_tweets = f"SELECT tweet_id, tweet_text FROM collected_tweets WHERE user_id = '{user_id}'"
-    tweets_to_post = run_query(query_tweets, fetchall=True) or []
+    # Reservar solo las publicaciones vencidas que entran en el límite; otro
+    # publicador en paralelo nunca recibe las mismas filas
+    tweets_to_post = await claim_due_posts(user_id, posted_limiter.remaining(user_id))
 
     if not tweets_to_post:
         print(f"⚠ Usuario {user_id} no tiene tweets pendientes de publicación.")
         return
 
-    async with aiohttp.ClientSession() as session:
-        await post_tweets_for_user(session, user_id, tweets_to_post, posting_event, tweet_limit, tweets_posted_last_hour)
+    await post_tweets_for_user(get_http_session(), user_id, tweets_to_post, posting_event)
 
     print(f"✅ Publicación de tweets completada para usuario ID: {user_id}.")
 
-async def post_tweets_for_user(session, user_id, tweets, posting_event, tweet_limit, tweets_posted_last_hour):
+async def post_tweets_for_user(session, user_id, tweets, posting_event):
+    """
+    Publica las filas reservadas de post_queue: [(queue_id, tweet_id, texto, intentos)].
+    Las que no se llegan a publicar (detención o límite) vuelven a la cola.
+    """
+    pending = {queue_id for queue_id, _, _, _ in tweets}
     try:
         if posting_event.is_set():
             print(f"⏹️ Proceso detenido para usuario ID: {user_id}.")
@@ -421,44 +462,56 @@ async def post_tweets_for_user(session, user_id, tweets, posting_event, tweet_li
 
         print(f"📢 Publicando tweets para usuario ID: {user_id}...")
 
-        for tweet_id, tweet_text in tweets:
+        for queue_id, tweet_id, tweet_text, attempts in tweets:
             if posting_event.is_set():
                 print(f"⏹️ Proceso detenido mientras se publicaban tweets.")
                 break
 
-            if tweets_posted_last_hour >= tweet_limit:
+            if posted_limiter.remaining(user_id) <= 0:
                 print(f"⛔ Usuario {user_id} alcanzó el límite mientras publicaba. Deteniendo la publicación.")
                 break
 
-            # Verificar si el tweet ya fue publicado
-            check_query = f"SELECT 1 FROM posted_tweets WHERE user_id = '{user_id}' AND tweet_text = '{tweet_text}' LIMIT 1"
-            exists = run_query(check_query, fetchone=True)
-            
-            if exists:
+            pending.discard(queue_id)
+
+            # Reservar el tweet en posted_tweets por hash: si ya existe, ya fue publicado
+            tweet_hash = await posted_hash_index.reserve(user_id, tweet_text)
+            if tweet_hash is RESERVE_FAILED:
+                # Sin la reserva no se sabe si ya se publicó: la fila y las siguientes vuelven a la cola
+                print(f"❌ No se pudo reservar el tweet en posted_tweets. Se reintentará: {tweet_text[:50]}...")
+                pending.add(queue_id)
+                break
+            if tweet_hash is None:
                 print(f"⚠ El tweet ya fue publicado previamente. Saltando: {tweet_text[:50]}...")
+                await mark_duplicate(queue_id)
                 continue
 
-            response, status_code = post_tweet(user_id, tweet_text)
+            response, status_code = await post_tweet_async(session, user_id, tweet_text)
 
             if status_code == 200:
-                # Guardar el tweet en posted_tweets
-                insert_query = f"INSERT INTO posted_tweets (user_id, tweet_text, created_at) VALUES ('{user_id}', '{tweet_text}', NOW())"
-                run_query(insert_query)
                 print(f"✅ Tweet guardado en posted_tweets: {tweet_text[:50]}...")
                 
-                # Eliminar el tweet de collected_tweets
+                # Eliminar el tweet de collected_tweets y de la cola
                 delete_query = f"DELETE FROM collected_tweets WHERE tweet_id = '{tweet_id}' AND user_id = '{user_id}'"
-                run_query(delete_query)
+                await run_query_async(delete_query)
+                await complete_post(queue_id)
                 print(f"🗑️ Tweet eliminado de collected_tweets después de ser publicado: {tweet_text[:50]}...")
                 
-                tweets_posted_last_hour += 1  # Incrementar contador de tweets publicados
+                posted_limiter.record(user_id)  # Registrar la publicación en la ventana de la última hora
+            elif response.get("uncertain"):
+                # Pudo haberse publicado: se conserva la reserva del hash y no se reintenta
+                print(f"⚠ No se sabe si el tweet se publicó. Queda para revisión: {tweet_text[:50]}...")
+                await review_post(queue_id, response.get("error"))
+                posted_limiter.record(user_id)
             else:
                 print(f"❌ No se pudo publicar el tweet: {response.get('error')}")
-
-            await asyncio.sleep(0.1)
+                await posted_hash_index.release(user_id, tweet_hash)
+                await fail_post(queue_id, attempts, response.get("error"))
 
     except asyncio.CancelledError:
         print(f"⏹️ Publicación de tweets cancelada para usuario ID: {user_id}.")
+        raise
+    finally:
+        await release_posts(pending)
 
     print(f"✅ Publicación de tweets finalizada para usuario ID: {user_id}.")
 
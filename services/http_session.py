@@ -0,0 +1,41 @@
+import asyncio
+import weakref
+import aiohttp
+from config import Config
+
+# Una sesión por event loop (recolector y publicador): mantiene abiertas las
+# conexiones TLS entre ciclos en lugar de crear una sesión por usuario.
+_sessions = weakref.WeakKeyDictionary()
+
+
+def create_http_session():
+    """ Sesión con el conector y los timeouts configurados. Quien la crea debe cerrarla. """
+    connector = aiohttp.TCPConnector(
+        limit=Config.HTTP_MAX_CONNECTIONS,
+        limit_per_host=Config.HTTP_MAX_CONNECTIONS_PER_HOST,
+        keepalive_timeout=Config.HTTP_KEEPALIVE_SECONDS,
+        ttl_dns_cache=Config.HTTP_DNS_CACHE_SECONDS
+    )
+    timeout = aiohttp.ClientTimeout(
+        total=Config.HTTP_TOTAL_TIMEOUT_SECONDS,
+        connect=Config.HTTP_CONNECT_TIMEOUT_SECONDS,
+        sock_read=Config.HTTP_READ_TIMEOUT_SECONDS
+    )
+    return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+
+def get_http_session():
+    """ Sesión compartida del event loop actual; se crea en el primer uso. """
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = create_http_session()
+        _sessions[loop] = session
+    return session
+
+
+async def close_http_session():
+    """ Cierra la sesión del event loop actual (al detener el recolector o el publicador). """
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None and not session.closed:
+        await session.close()
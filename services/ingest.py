@@ -0,0 +1,200 @@
+from services.db_service import run_query_async, quote_literal, translate_texts_with_openai
+from services.translation_cache import translation_cache, translation_key
+from services.seen_tweets import seen_tweet_index
+from services.rate_limiter import collected_limiter
+from services.simhash import near_duplicate_index
+from services.account_config import custom_style_prompt, load_account_configs
+from services.content_filters import content_filter
+from services.language_id import language_identifier
+
+# Prefijo del estilo en la clave de caché de las reescrituras (textos ya en el idioma de destino)
+RESTYLE_CACHE_MARKER = "restyle\x1f"
+
+
+async def get_user_translation_settings(user_id):
+    language_query = f"SELECT language, custom_style FROM users WHERE id = {user_id}"
+    user_language = await run_query_async(language_query, fetchone=True)
+    if not user_language:
+        return None
+
+    target_language = user_language[0]
+    if user_language[1] and len(user_language[1]) > 0:
+        custom_style = f'Custom Style: {user_language[1]}'
+    else:
+        custom_style = ''
+    return target_language, custom_style
+
+
+async def filter_known_tweet_ids(user_id, tweet_ids):
+    """ Devuelve los ids que ya están en collected_tweets para el usuario, en una sola consulta. """
+    if not tweet_ids:
+        return set()
+
+    query = f"""
+    SELECT tweet_id FROM collected_tweets
+    WHERE user_id = {user_id}
+    AND tweet_id IN ({", ".join(quote_literal(tweet_id) for tweet_id in tweet_ids)})
+    """
+    rows = await run_query_async(query, fetchall=True) or []
+    return {str(row[0]) for row in rows}
+
+
+async def translate_with_cache(user_id, tweets, target_language, custom_style, restyle=False):
+    """ Traduce (o, con restyle, solo reescribe con el estilo) usando primero la caché y luego OpenAI en lote. """
+    # Las reescrituras de estilo se guardan aparte de las traducciones del mismo texto
+    style_key = f"{RESTYLE_CACHE_MARKER}{custom_style}" if restyle else custom_style
+    cache_keys = {
+        tweet["id_str"]: translation_key(tweet["full_text"], target_language, style_key)
+        for tweet in tweets
+    }
+    cached = await translation_cache.get_many(cache_keys.values())
+    translations = {
+        tweet_id: cached[key] for tweet_id, key in cache_keys.items() if key in cached
+    }
+    if translations:
+        print(f"♻️ {len(translations)} traducciones obtenidas de la caché para el usuario {user_id}.")
+
+    to_translate = [
+        (tweet["id_str"], tweet["full_text"]) for tweet in tweets if tweet["id_str"] not in translations
+    ]
+    new_translations = await translate_texts_with_openai(to_translate, target_language, custom_style, restyle)
+    await translation_cache.set_many({cache_keys[tweet_id]: text for tweet_id, text in new_translations.items()})
+    translations.update(new_translations)
+    return translations
+
+
+async def translate_pending_tweets(user_id, tweets, target_language, custom_style):
+    """
+    Traduce los tweets usando primero la caché y luego OpenAI en lote. Devuelve {tweet_id: traducción}.
+    Los tweets que ya están en el idioma de destino no se traducen: sin estilo
+    personalizado se guardan tal cual; con estilo, OpenAI solo les aplica el estilo.
+    """
+    same_language, tweets = language_identifier.split_by_language(tweets, target_language)
+    translations = {}
+    if same_language and not custom_style:
+        print(f"🈯 {len(same_language)} tweets ya están en '{target_language}' para el usuario {user_id}. No se traducen.")
+        translations = {tweet["id_str"]: tweet["full_text"] for tweet in same_language}
+    elif same_language:
+        print(f"🖌️ {len(same_language)} tweets ya están en '{target_language}' para el usuario {user_id}. Solo se aplica el estilo.")
+        translations = await translate_with_cache(user_id, same_language, target_language, custom_style, restyle=True)
+
+    if tweets:
+        translations.update(await translate_with_cache(user_id, tweets, target_language, custom_style))
+    return translations
+
+
+async def select_new_tweets(user_id, tweets, limit=None, account=None):
+    """
+    Descarta los tweets repetidos, los que no pasan los filtros de contenido de
+    la cuenta, los que ya están en collected_tweets (con una sola consulta) y los
+    casi idénticos a uno reciente (SimHash), y devuelve los nuevos, hasta limit.
+    """
+    tweets = list({tweet["id_str"]: tweet for tweet in tweets}.values())
+    if not tweets:
+        return []
+
+    # Los filtros no consultan la base: se aplican primero sobre toda la página
+    if account is not None:
+        tweets, filtered = content_filter.apply(tweets, account.filters, account.language)
+        if filtered:
+            summary = ", ".join(f"{reason}: {len(reason_tweets)}" for reason, reason_tweets in filtered.items())
+            print(f"🧹 Tweets descartados por filtros para el usuario {user_id} ({summary}).")
+            await seen_tweet_index.mark_seen(
+                user_id, [tweet["id_str"] for reason_tweets in filtered.values() for tweet in reason_tweets]
+            )
+        if not tweets:
+            return []
+
+    known_ids = await filter_known_tweet_ids(user_id, [tweet["id_str"] for tweet in tweets])
+    pending = [tweet for tweet in tweets if tweet["id_str"] not in known_ids]
+    if known_ids:
+        print(f"⚠ {len(known_ids)} tweets ya existen para el usuario {user_id}. No se guardarán.")
+        await seen_tweet_index.mark_seen(user_id, known_ids)
+
+    # Retweets, citas y copias levemente editadas se descartan antes de traducir
+    pending, near_duplicates = near_duplicate_index.filter_batch(
+        user_id, pending, max(limit, 0) if limit is not None else None
+    )
+    if near_duplicates:
+        print(f"♊ {len(near_duplicates)} tweets casi idénticos a otros recientes para el usuario {user_id}. No se guardarán.")
+        await seen_tweet_index.mark_seen(user_id, [tweet["id_str"] for tweet in near_duplicates])
+    return pending
+
+
+async def translate_for_user(user_id, tweets, account=None):
+    """
+    Traduce los tweets al idioma del usuario. Devuelve (idioma, {tweet_id: traducción}) o None.
+    Si se recibe el AccountConfig del ciclo, no se consulta la configuración.
+    """
+    if account is not None:
+        settings = (account.language, custom_style_prompt(account))
+    else:
+        settings = await get_user_translation_settings(user_id)
+    if not settings:
+        print(f"❌ No se encontró el idioma para el usuario {user_id}.")
+        return None
+    target_language, custom_style = settings
+
+    translations = await translate_pending_tweets(user_id, tweets, target_language, custom_style)
+    return target_language, translations
+
+
+async def persist_translated_tweets(user_id, source_type, source_value, tweets, translations, target_language):
+    """
+    Inserta los tweets traducidos con un único INSERT ... ON CONFLICT DO NOTHING.
+    Devuelve [(tweet_id, texto)] de los tweets efectivamente insertados.
+    """
+    rows = []
+    for tweet in tweets:
+        tweet_id = tweet["id_str"]
+        translated_text = translations.get(tweet_id)
+        if not translated_text:
+            print(f"❌ No se pudo traducir el tweet {tweet_id}. No se guardará.")
+            continue
+
+        print(f"🌐 Tweet traducido al idioma '{target_language}': {translated_text}")
+        rows.append(
+            f"({user_id if user_id is not None else 'NULL'}, {quote_literal(source_type)}, {quote_literal(source_value)}, "
+            f"{quote_literal(tweet_id)}, {quote_literal(translated_text)}, {quote_literal(tweet['tweet_created_at'])})"
+        )
+
+    if not rows:
+        return []
+
+    insert_query = f"""
+    INSERT INTO collected_tweets (user_id, source_type, source_value, tweet_id, tweet_text, created_at)
+    VALUES {", ".join(rows)}
+    ON CONFLICT (tweet_id, user_id) DO NOTHING
+    RETURNING tweet_id, tweet_text, EXTRACT(EPOCH FROM NOW() - created_at)
+    """
+    inserted = await run_query_async(insert_query, fetchall=True) or []
+    await seen_tweet_index.mark_seen(user_id, [row[0] for row in inserted])
+    # Solo los tweets guardados cuentan como recientes para detectar casi duplicados
+    inserted_ids = {str(row[0]) for row in inserted}
+    near_duplicate_index.register(user_id, [tweet for tweet in tweets if tweet["id_str"] in inserted_ids])
+    collected_limiter.record(user_id, ages=[row[2] for row in inserted])
+    print(f"✅ {len(inserted)} tweets guardados correctamente para el usuario {user_id}.")
+    return [(row[0], row[1]) for row in inserted]
+
+
+async def ingest_tweets(user_id, source_type, source_value, tweets, limit=None, account=None):
+    """
+    Ingesta en bloque de los tweets obtenidos de SocialData para un usuario:
+    descarta los ids conocidos con una consulta, traduce solo los nuevos (hasta
+    limit) y los inserta con un único INSERT ... ON CONFLICT DO NOTHING.
+    Devuelve la cantidad de tweets insertados.
+    """
+    if account is None and user_id is not None:
+        account = (await load_account_configs([user_id])).get(user_id)
+
+    pending = await select_new_tweets(user_id, tweets, limit, account)
+    if not pending:
+        return 0
+
+    translated = await translate_for_user(user_id, pending, account)
+    if not translated:
+        return 0
+    target_language, translations = translated
+
+    inserted = await persist_translated_tweets(user_id, source_type, source_value, pending, translations, target_language)
+    return len(inserted)
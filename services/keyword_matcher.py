@@ -0,0 +1,158 @@
+import threading
+from collections import deque
+
+
+class AhoCorasick:
+    """
+    Autómata de Aho-Corasick para buscar muchas keywords a la vez en una sola
+    pasada sobre el texto. Admite agregar patrones sin reconstruir el trie:
+    solo se recalculan los enlaces de fallo.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._own = [set()]
+        self._output = [set()]
+        self.patterns = set()
+
+    def add(self, pattern):
+        if pattern in self.patterns:
+            return
+        node = 0
+        for char in pattern:
+            next_node = self._goto[node].get(char)
+            if next_node is None:
+                next_node = len(self._goto)
+                self._goto[node][char] = next_node
+                self._goto.append({})
+                self._fail.append(0)
+                self._own.append(set())
+                self._output.append(set())
+            node = next_node
+        self._own[node].add(pattern)
+        self.patterns.add(pattern)
+
+    def build(self):
+        """ Calcula los enlaces de fallo y las salidas con un recorrido BFS desde la raíz. """
+        self._output = [set(own) for own in self._own]
+
+        queue = deque()
+        for child in self._goto[0].values():
+            self._fail[child] = 0
+            queue.append(child)
+
+        while queue:
+            node = queue.popleft()
+            for char, child in self._goto[node].items():
+                fail = self._fail[node]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[child] = self._goto[fail].get(char, 0)
+                self._output[child] |= self._output[self._fail[child]]
+                queue.append(child)
+
+    def find(self, text):
+        """ Devuelve las keywords que aparecen en text como palabras completas. """
+        found = set()
+        node = 0
+        for index, char in enumerate(text):
+            while node and char not in self._goto[node]:
+                node = self._fail[node]
+            node = self._goto[node].get(char, 0)
+            for pattern in self._output[node]:
+                if pattern in found:
+                    continue
+                start = index - len(pattern) + 1
+                if is_word_boundary(text, start - 1, pattern[0]) and is_word_boundary(text, index + 1, pattern[-1]):
+                    found.add(pattern)
+        return found
+
+
+def is_word_boundary(text, position, edge_char):
+    """ Un patrón cuyo borde es alfanumérico no puede estar pegado a otra letra o dígito. """
+    if not edge_char.isalnum() or position < 0 or position >= len(text):
+        return True
+    return not (text[position].isalnum() or text[position] == "_")
+
+
+class KeywordMatcher:
+    """
+    Asocia los tweets de los usuarios monitoreados con las cuentas a las que
+    pertenecen, buscando localmente las keywords de todas las cuentas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._account_handles = {}
+        self._account_keywords = {}
+        self._keyword_accounts = {}
+        self._automaton = AhoCorasick()
+
+    def update_account(self, user_id, handles, keywords):
+        """ Actualiza una cuenta; el autómata solo cambia si aparecen keywords nuevas. """
+        keywords = {keyword.strip().lower() for keyword in keywords if keyword and keyword.strip()}
+        with self._lock:
+            self._account_handles[user_id] = {handle.lower() for handle in handles}
+            previous = self._account_keywords.get(user_id, set())
+            if previous == keywords:
+                return
+            self._account_keywords[user_id] = keywords
+
+            for keyword in previous - keywords:
+                self._keyword_accounts[keyword].discard(user_id)
+                if not self._keyword_accounts[keyword]:
+                    del self._keyword_accounts[keyword]
+            for keyword in keywords - previous:
+                self._keyword_accounts.setdefault(keyword, set()).add(user_id)
+
+            self._refresh_automaton()
+
+    def remove_account(self, user_id):
+        with self._lock:
+            self._account_handles.pop(user_id, None)
+            for keyword in self._account_keywords.pop(user_id, set()):
+                self._keyword_accounts[keyword].discard(user_id)
+                if not self._keyword_accounts[keyword]:
+                    del self._keyword_accounts[keyword]
+            self._refresh_automaton()
+
+    def _refresh_automaton(self):
+        """ Agrega las keywords nuevas; reconstruye solo si sobran demasiados patrones viejos. Requiere el lock. """
+        active = set(self._keyword_accounts)
+        stale = self._automaton.patterns - active
+        new = active - self._automaton.patterns
+
+        if len(stale) > len(active):
+            self._automaton = AhoCorasick()
+            new = active
+        elif not new:
+            return
+
+        for keyword in new:
+            self._automaton.add(keyword)
+        self._automaton.build()
+
+    def handles(self):
+        with self._lock:
+            return sorted(set().union(*self._account_handles.values())) if self._account_handles else []
+
+    def match(self, text, author):
+        """ Devuelve las cuentas que monitorean a author y tienen alguna keyword presente en text. """
+        with self._lock:
+            accounts = set()
+            for keyword in self._automaton.find(text.lower()):
+                accounts |= self._keyword_accounts.get(keyword, set())
+            return {user_id for user_id in accounts if author in self._account_handles.get(user_id, ())}
+
+    def match_batch(self, tweets):
+        """ Reparte una página de tweets: {user_id: [tweets]}. """
+        per_account = {}
+        for tweet in tweets:
+            author = ((tweet.get("user") or {}).get("screen_name") or "").lower()
+            for user_id in self.match(tweet.get("full_text", ""), author):
+                per_account.setdefault(user_id, []).append(tweet)
+        return per_account
+
+
+keyword_matcher = KeywordMatcher()
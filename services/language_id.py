@@ -0,0 +1,188 @@
+import math
+import re
+import threading
+import unicodedata
+from collections import Counter
+from config import Config
+
+# Idiomas de destino habituales (columna users.language) → código ISO 639-1,
+# el mismo que devuelve SocialData en el campo lang
+LANGUAGE_CODES = {
+    "es": "es", "spanish": "es", "español": "es", "espanol": "es", "castellano": "es",
+    "en": "en", "english": "en", "inglés": "en", "ingles": "en",
+    "pt": "pt", "portuguese": "pt", "portugués": "pt", "portugues": "pt", "português": "pt",
+    "fr": "fr", "french": "fr", "francés": "fr", "frances": "fr", "français": "fr",
+    "it": "it", "italian": "it", "italiano": "it",
+    "de": "de", "german": "de", "alemán": "de", "aleman": "de", "deutsch": "de",
+}
+
+# Valores de lang que no identifican un idioma (indeterminado, sin texto, solo medios...)
+UNDETERMINED_LANGS = {"", "und", "zxx", "qme", "qht", "qam", "qct", "qst", "art"}
+
+# Textos de muestra con los que se arma el perfil de n-gramas de cada idioma
+LANGUAGE_SAMPLES = {
+    "es": (
+        "el gobierno anunció hoy que las nuevas medidas económicas entrarán en vigencia la próxima semana. "
+        "los usuarios de las redes sociales compartieron su opinión sobre el partido de anoche y el resultado final. "
+        "es importante que todos los ciudadanos puedan acceder a la información de manera clara y rápida. "
+        "según el informe, la inflación de este año fue más alta de lo que se esperaba para el país. "
+        "muchas gracias a todos por el apoyo, nos vemos mañana en la conferencia con más novedades."
+    ),
+    "en": (
+        "the government announced today that the new economic measures will take effect next week. "
+        "social media users shared their opinion about last night's game and the final result. "
+        "it is important that all citizens can access the information in a clear and quick way. "
+        "according to the report, inflation this year was higher than what was expected for the country. "
+        "thank you all so much for the support, see you tomorrow at the conference with more news."
+    ),
+    "pt": (
+        "o governo anunciou hoje que as novas medidas econômicas vão entrar em vigor na próxima semana. "
+        "os usuários das redes sociais compartilharam sua opinião sobre o jogo de ontem e o resultado final. "
+        "é importante que todos os cidadãos possam acessar a informação de forma clara e rápida. "
+        "segundo o relatório, a inflação deste ano foi maior do que se esperava para o país. "
+        "muito obrigado a todos pelo apoio, nos vemos amanhã na conferência com mais novidades."
+    ),
+    "fr": (
+        "le gouvernement a annoncé aujourd'hui que les nouvelles mesures économiques entreront en vigueur la semaine prochaine. "
+        "les utilisateurs des réseaux sociaux ont partagé leur avis sur le match d'hier soir et le résultat final. "
+        "il est important que tous les citoyens puissent accéder à l'information de manière claire et rapide. "
+        "selon le rapport, l'inflation de cette année a été plus élevée que prévu pour le pays. "
+        "merci beaucoup à tous pour votre soutien, on se voit demain à la conférence avec plus de nouvelles."
+    ),
+    "it": (
+        "il governo ha annunciato oggi che le nuove misure economiche entreranno in vigore la prossima settimana. "
+        "gli utenti dei social network hanno condiviso la loro opinione sulla partita di ieri sera e sul risultato finale. "
+        "è importante che tutti i cittadini possano accedere alle informazioni in modo chiaro e veloce. "
+        "secondo il rapporto, l'inflazione di quest'anno è stata più alta di quanto si aspettava per il paese. "
+        "grazie mille a tutti per il sostegno, ci vediamo domani alla conferenza con altre novità."
+    ),
+    "de": (
+        "die regierung hat heute angekündigt, dass die neuen wirtschaftlichen maßnahmen nächste woche in kraft treten. "
+        "die nutzer der sozialen netzwerke teilten ihre meinung über das spiel von gestern abend und das endergebnis. "
+        "es ist wichtig, dass alle bürger schnell und klar auf die informationen zugreifen können. "
+        "laut dem bericht war die inflation in diesem jahr höher als für das land erwartet wurde. "
+        "vielen dank an alle für die unterstützung, wir sehen uns morgen auf der konferenz mit mehr neuigkeiten."
+    ),
+}
+
+NGRAM_SIZES = (2, 3)
+# Suavizado de los n-gramas que no aparecen en las muestras de un idioma
+SMOOTHING = 0.5
+UNSEEN_VOCABULARY = 1000
+# Menciones, hashtags y URLs no aportan al idioma del texto
+NOISE_PATTERN = re.compile(r"https?://\S+|[@#]\w+|\brt\b")
+WORD_PATTERN = re.compile(r"[^\W\d_]+", re.UNICODE)
+
+
+def language_code(language):
+    """ Código ISO del idioma de destino de una cuenta, o None si no se reconoce. """
+    if not language:
+        return None
+    return LANGUAGE_CODES.get(unicodedata.normalize("NFC", language).strip().lower())
+
+
+def ngrams(text):
+    """ n-gramas de caracteres de cada palabra, con espacios como bordes. """
+    text = NOISE_PATTERN.sub(" ", text.lower())
+    counts = Counter()
+    letters = 0
+    for word in WORD_PATTERN.findall(text):
+        letters += len(word)
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for start in range(len(padded) - size + 1):
+                gram = padded[start:start + size]
+                if gram.strip():
+                    counts[gram] += 1
+    return counts, letters
+
+
+class LanguageProfile:
+    """ Log-probabilidades suavizadas de los n-gramas de un idioma. """
+
+    def __init__(self, text):
+        counts, _ = ngrams(text)
+        denominator = sum(counts.values()) + SMOOTHING * (len(counts) + UNSEEN_VOCABULARY)
+        self.unseen = math.log(SMOOTHING / denominator)
+        self.log_probs = {gram: math.log((count + SMOOTHING) / denominator) for gram, count in counts.items()}
+
+    def score(self, counts):
+        return sum(count * self.log_probs.get(gram, self.unseen) for gram, count in counts.items())
+
+
+class LanguageIdentifier:
+    """
+    Identificación local del idioma de los tweets para no traducir los que ya
+    están en el idioma de la cuenta. Primero se usa el campo lang de SocialData;
+    si falta o es indeterminado, se clasifica el texto con un modelo bayesiano
+    de n-gramas de caracteres armado con las muestras de cada idioma.
+    """
+
+    def __init__(self, samples, min_letters, min_margin):
+        self.min_letters = min_letters
+        self.min_margin = min_margin
+        self._profiles = {code: LanguageProfile(text) for code, text in samples.items()}
+        self._lock = threading.Lock()
+        self._detected = Counter()
+        self._skipped = 0
+
+    def classify(self, text):
+        """ Devuelve (código, confianza) según el modelo local, o (None, 0) si el texto es muy corto. """
+        counts, letters = ngrams(text)
+        if letters < self.min_letters:
+            return None, 0.0
+
+        scores = sorted(((profile.score(counts), code) for code, profile in self._profiles.items()), reverse=True)
+        (best, code), (second, _) = scores[0], scores[1]
+        # La confianza es la ventaja (en log-probabilidad por n-grama) sobre el segundo idioma
+        return code, (best - second) / sum(counts.values())
+
+    def detect(self, tweet):
+        """ (código, origen) del idioma del tweet; (None, None) si no hay confianza suficiente. """
+        lang = (tweet.get("lang") or "").lower()
+        if lang not in UNDETERMINED_LANGS:
+            return lang.split("-")[0], "socialdata"
+
+        code, confidence = self.classify(tweet.get("full_text") or "")
+        if code is not None and confidence >= self.min_margin:
+            return code, "model"
+        return None, None
+
+    def split_by_language(self, tweets, target_language):
+        """
+        Separa una página de tweets en (ya en el idioma de destino, a traducir).
+        Si el idioma de destino no se reconoce, todos se traducen.
+        """
+        target = language_code(target_language)
+        if target is None:
+            return [], list(tweets)
+
+        same = []
+        other = []
+        sources = Counter()
+        for tweet in tweets:
+            code, source = self.detect(tweet)
+            if code == target:
+                same.append(tweet)
+                sources[source] += 1
+            else:
+                other.append(tweet)
+
+        with self._lock:
+            self._detected.update(sources)
+            self._skipped += len(same)
+        return same, other
+
+    def stats(self):
+        with self._lock:
+            return {
+                "translations_skipped": self._skipped,
+                "detected_by": dict(self._detected),
+            }
+
+
+language_identifier = LanguageIdentifier(
+    LANGUAGE_SAMPLES,
+    Config.LANGUAGE_ID_MIN_LETTERS,
+    Config.LANGUAGE_ID_MIN_MARGIN
+)
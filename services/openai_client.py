@@ -0,0 +1,69 @@
+import asyncio
+import weakref
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+from config import Config
+from services.outbound_limiter import outbound_limiters
+
+# Un cliente por event loop y API key: el cliente HTTP interno mantiene
+# las conexiones abiertas entre llamadas, pero no puede compartirse entre loops.
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_openai_client(api_key):
+    loop = asyncio.get_running_loop()
+    loop_clients = _clients.setdefault(loop, {})
+
+    client = loop_clients.get(api_key)
+    if client is None:
+        # Si la API key cambió, el cliente anterior se cierra en segundo plano
+        for old_key in list(loop_clients):
+            loop.create_task(loop_clients.pop(old_key).close())
+
+        client = AsyncOpenAI(
+            api_key=api_key,
+            timeout=Config.OPENAI_TIMEOUT_SECONDS,
+            max_retries=0
+        )
+        loop_clients[api_key] = client
+    return client
+
+
+def is_retryable(error):
+    if isinstance(error, (APITimeoutError, APIConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+async def create_chat_completion(api_key, **kwargs):
+    """
+    Llama a chat.completions con el cliente compartido, respetando el límite
+    global de OpenAI y reencolando con backoff ante 429, errores 5xx y timeouts.
+    """
+    client = get_async_openai_client(api_key)
+    limiter = outbound_limiters["openai"]
+
+    attempt = 0
+    while True:
+        try:
+            async with limiter.slot():
+                return await client.chat.completions.create(**kwargs)
+        except Exception as e:
+            if not is_retryable(e):
+                raise
+            response = getattr(e, "response", None)
+            headers = response.headers if response is not None else None
+            delay = limiter.retry_delay(attempt, headers, getattr(e, "status_code", None))
+            if delay is None:
+                raise
+            print(f"⏳ OpenAI respondió con error ({e.__class__.__name__}). Reintentando en {delay:.1f}s...")
+            attempt += 1
+            await asyncio.sleep(delay)
+
+
+async def close_openai_clients():
+    """ Cierra los clientes del event loop actual (al detener el servicio). """
+    loop = asyncio.get_running_loop()
+    for client in _clients.pop(loop, {}).values():
+        await client.close()
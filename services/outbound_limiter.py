@@ -0,0 +1,213 @@
+import asyncio
+import random
+import re
+import threading
+import time
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+from config import Config
+
+# Cada cuánto se vuelve a intentar tomar un lugar cuando se alcanzó la concurrencia máxima
+CONCURRENCY_POLL_SECONDS = 0.05
+
+RESET_HEADERS = ("x-ratelimit-reset", "x-ratelimit-reset-requests", "x-rate-limit-reset")
+REMAINING_HEADERS = ("x-ratelimit-remaining", "x-ratelimit-remaining-requests", "x-rate-limit-remaining")
+
+
+def parse_seconds(value):
+    """
+    Interpreta Retry-After / x-ratelimit-reset: segundos ("2.5"), epoch en
+    segundos, fecha HTTP o duraciones estilo OpenAI ("1m30s", "250ms").
+    Devuelve los segundos a esperar o None.
+    """
+    if value is None:
+        return None
+    value = str(value).strip()
+    try:
+        seconds = float(value)
+        # Un número muy grande es un instante absoluto (epoch)
+        return max(seconds - time.time(), 0) if seconds > 1e9 else max(seconds, 0)
+    except ValueError:
+        pass
+
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value)
+    if parts and "".join(number + unit for number, unit in parts) == value:
+        factors = {"h": 3600, "m": 60, "s": 1, "ms": 0.001}
+        return sum(float(number) * factors[unit] for number, unit in parts)
+
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+
+class ProviderLimiter:
+    """
+    Token bucket + tope de concurrencia compartido por todas las llamadas a un
+    proveedor, sin importar el hilo o event loop desde el que se hagan.
+    Cuando el proveedor responde 429 o avisa que no quedan pedidos, el bucket
+    se bloquea para todos hasta la hora indicada y la llamada se reencola con
+    backoff exponencial con jitter en lugar de descartarse.
+    """
+
+    def __init__(self, name, rate_per_second, burst, max_concurrency, max_retries, backoff_base_seconds):
+        self.name = name
+        self.rate_per_second = rate_per_second
+        self.burst = burst
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_base_seconds = backoff_base_seconds
+
+        self._lock = threading.Lock()
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._blocked_until = 0.0
+        self._in_flight = 0
+
+        self._requests = 0
+        self._throttled = 0
+        self._retries = 0
+        self._waits = 0
+        self._total_wait = 0.0
+
+    def _refill(self, now):
+        """ Requiere el lock. """
+        elapsed = now - self._updated_at
+        self._tokens = min(self.burst, self._tokens + elapsed * self.rate_per_second)
+        self._updated_at = now
+
+    def _try_acquire(self):
+        """ Toma un token y un lugar; si no puede, devuelve cuánto esperar. """
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._blocked_until:
+                return self._blocked_until - now
+            if self._in_flight >= self.max_concurrency:
+                return CONCURRENCY_POLL_SECONDS
+            if self._tokens < 1:
+                return (1 - self._tokens) / self.rate_per_second
+            self._tokens -= 1
+            self._in_flight += 1
+            self._requests += 1
+            return 0
+
+    async def acquire(self):
+        started = time.monotonic()
+        waited = False
+        while True:
+            delay = self._try_acquire()
+            if not delay:
+                break
+            waited = True
+            await asyncio.sleep(delay)
+
+        if waited:
+            with self._lock:
+                self._waits += 1
+                self._total_wait += time.monotonic() - started
+
+    def release(self):
+        with self._lock:
+            self._in_flight = max(self._in_flight - 1, 0)
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def block_for(self, seconds):
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def observe(self, headers):
+        """ Si el proveedor informa que no quedan pedidos, bloquea hasta el reset. """
+        if not headers:
+            return
+        remaining = next((headers.get(name) for name in REMAINING_HEADERS if headers.get(name) is not None), None)
+        try:
+            exhausted = remaining is not None and float(remaining) <= 0
+        except ValueError:
+            exhausted = False
+        if not exhausted:
+            return
+
+        reset = next((parse_seconds(headers.get(name)) for name in RESET_HEADERS if headers.get(name) is not None), None)
+        if reset:
+            self.block_for(reset)
+
+    def retry_delay(self, attempt, headers=None, status=None):
+        """
+        Registra un rechazo y devuelve cuánto esperar antes de reencolar la
+        llamada, o None si se agotaron los reintentos.
+        """
+        retry_after = parse_seconds(headers.get("retry-after")) if headers else None
+
+        with self._lock:
+            if status == 429:
+                self._throttled += 1
+            if attempt >= self.max_retries:
+                return None
+            self._retries += 1
+
+        if retry_after is None:
+            retry_after = self.backoff_base_seconds * (2 ** attempt)
+        delay = retry_after + random.uniform(0, self.backoff_base_seconds / 2)
+
+        # Un 429 frena a todas las llamadas al proveedor, no solo a esta
+        if status == 429:
+            self.block_for(delay)
+        return delay
+
+    def stats(self):
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            return {
+                "rate_per_second": self.rate_per_second,
+                "burst": self.burst,
+                "tokens": round(self._tokens, 2),
+                "in_flight": self._in_flight,
+                "max_concurrency": self.max_concurrency,
+                "blocked_for_seconds": round(max(self._blocked_until - now, 0), 2),
+                "requests": self._requests,
+                "throttled": self._throttled,
+                "retries": self._retries,
+                "waits": self._waits,
+                "avg_wait_ms": round(self._total_wait / self._waits * 1000, 2) if self._waits else 0,
+            }
+
+
+outbound_limiters = {
+    "socialdata": ProviderLimiter(
+        "socialdata",
+        Config.SOCIALDATA_RATE_PER_SECOND,
+        Config.SOCIALDATA_BURST,
+        Config.SOCIALDATA_MAX_CONCURRENCY,
+        Config.SOCIALDATA_MAX_RETRIES,
+        Config.OUTBOUND_BACKOFF_BASE_SECONDS
+    ),
+    "openai": ProviderLimiter(
+        "openai",
+        Config.OPENAI_RATE_PER_SECOND,
+        Config.OPENAI_BURST,
+        Config.OPENAI_MAX_CONCURRENCY,
+        Config.OPENAI_MAX_RETRIES,
+        Config.OPENAI_BACKOFF_BASE_SECONDS
+    ),
+    "rapidapi": ProviderLimiter(
+        "rapidapi",
+        Config.RAPIDAPI_RATE_PER_SECOND,
+        Config.RAPIDAPI_BURST,
+        Config.RAPIDAPI_MAX_CONCURRENCY,
+        Config.RAPIDAPI_MAX_RETRIES,
+        Config.OUTBOUND_BACKOFF_BASE_SECONDS
+    ),
+}
+
+
+def outbound_stats():
+    return {name: limiter.stats() for name, limiter in outbound_limiters.items()}
@@ -0,0 +1,259 @@
+import asyncio
+import threading
+import time
+from config import Config
+from services.ingest import select_new_tweets, translate_for_user, persist_translated_tweets
+from services.rate_limiter import collected_limiter, posted_limiter
+from services.fetch_tweets import fetch_tweets_for_users, post_tweets_for_user
+from services.post_queue import claim_new_posts
+from services.http_session import get_http_session
+
+
+class PipelineStage:
+    """ Una etapa del pipeline: cola acotada + workers propios + métricas. """
+
+    def __init__(self, name, handler, workers, queue_size):
+        self.name = name
+        self.handler = handler
+        self.workers = workers
+        self.queue_size = queue_size
+        self.queue = None
+
+        self._lock = threading.Lock()
+        self._processed = 0
+        self._failed = 0
+        self._in_flight = 0
+        self._busy_seconds = 0.0
+        self._started_at = None
+
+    def reset(self):
+        """ La cola se crea al iniciar, dentro del event loop que la va a usar. """
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._processed = 0
+            self._failed = 0
+            self._in_flight = 0
+            self._busy_seconds = 0.0
+            self._started_at = time.monotonic()
+
+    def begin(self):
+        with self._lock:
+            self._in_flight += 1
+
+    def finish(self, seconds, failed=False):
+        with self._lock:
+            self._in_flight -= 1
+            self._busy_seconds += seconds
+            if failed:
+                self._failed += 1
+            else:
+                self._processed += 1
+
+    def stats(self):
+        with self._lock:
+            elapsed = time.monotonic() - self._started_at if self._started_at else 0
+            handled = self._processed + self._failed
+            return {
+                "workers": self.workers,
+                "queue_depth": self.queue.qsize() if self.queue else 0,
+                "queue_size": self.queue_size,
+                "in_flight": self._in_flight,
+                "processed": self._processed,
+                "failed": self._failed,
+                "per_minute": round(self._processed / elapsed * 60, 2) if elapsed else 0,
+                "avg_ms": round(self._busy_seconds / handled * 1000, 2) if handled else 0,
+            }
+
+
+class PostingGate:
+    """
+    Evento de detención para post_tweets_for_user: se considera activado si se
+    detiene el pipeline o si el publicador de la app no está en marcha.
+    """
+
+    def __init__(self, stop_event, posting_active):
+        self.stop_event = stop_event
+        self.posting_active = posting_active
+
+    def is_set(self):
+        return self.stop_event.is_set() or not self.posting_active()
+
+
+class TweetPipeline:
+    """
+    Modo pipeline: los tweets recolectados pasan por etapas con colas acotadas
+    (deduplicar → traducir → guardar → publicar). Cuando una cola se llena, la
+    etapa anterior espera (backpressure) y, en última instancia, el recolector.
+    Así un tweet nuevo se publica segundos después de aparecer, sin esperar al
+    ciclo del publicador. Solo se publica mientras el publicador está en marcha;
+    si no, los tweets quedan en post_queue hasta que se inicie.
+    """
+
+    def __init__(self):
+        self.stages = [
+            PipelineStage("dedupe", self.dedupe, Config.PIPELINE_DEDUPE_WORKERS, Config.PIPELINE_QUEUE_SIZE),
+            PipelineStage("translate", self.translate, Config.PIPELINE_TRANSLATE_WORKERS, Config.PIPELINE_QUEUE_SIZE),
+            PipelineStage("persist", self.persist, Config.PIPELINE_PERSIST_WORKERS, Config.PIPELINE_QUEUE_SIZE),
+            PipelineStage("post", self.post, Config.PIPELINE_POST_WORKERS, Config.PIPELINE_QUEUE_SIZE),
+        ]
+        self._workers = []
+        self._stop_posting = threading.Event()
+        self._posting_gate = PostingGate(self._stop_posting, lambda: False)
+        self._running = False
+
+        self._lock = threading.Lock()
+        self._posted = 0
+        self._total_latency = 0.0
+
+    async def start(self, posting_active):
+        """ posting_active() indica si el publicador de la app está en marcha. """
+        self._stop_posting.clear()
+        self._posting_gate = PostingGate(self._stop_posting, posting_active)
+        with self._lock:
+            self._posted = 0
+            self._total_latency = 0.0
+
+        for stage in self.stages:
+            stage.reset()
+        for index, stage in enumerate(self.stages):
+            next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+            for _ in range(stage.workers):
+                self._workers.append(asyncio.create_task(self._work(stage, next_stage)))
+        self._running = True
+        print(f"🚰 Pipeline iniciado con {len(self._workers)} workers.")
+
+    async def stop(self):
+        """ Espera (con un límite) a que se vacíen las colas y detiene los workers. """
+        if not self._running:
+            return
+        try:
+            await asyncio.wait_for(self._drain(), Config.PIPELINE_DRAIN_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            print("⚠ El pipeline no terminó de vaciarse; los tweets guardados los publicará el publicador.")
+
+        self._stop_posting.set()
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        self._running = False
+        print("⏹️ Pipeline detenido.")
+
+    async def _drain(self):
+        for stage in self.stages:
+            await stage.queue.join()
+
+    async def _work(self, stage, next_stage):
+        while True:
+            item = await stage.queue.get()
+            stage.begin()
+            started = time.monotonic()
+            elapsed = None
+            try:
+                result = await stage.handler(item)
+                elapsed = time.monotonic() - started
+                # Pasar a la siguiente etapa antes de marcar el item como terminado,
+                # así _drain no da por vacía una cola con items en tránsito
+                if result is not None and next_stage is not None:
+                    await next_stage.queue.put(result)
+                else:
+                    await self._finish_item(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error en la etapa '{stage.name}' para el usuario {item.get('user_id')}: {e}")
+                await self._finish_item(item)
+            finally:
+                failed = elapsed is None
+                stage.finish(time.monotonic() - started if failed else elapsed, failed=failed)
+                stage.queue.task_done()
+
+    async def _finish_item(self, item):
+        """
+        El lote salió del pipeline (terminó, se descartó o falló): se avisa al
+        recolector para que avance sus cursores hasta lo efectivamente procesado.
+        Los lotes que quedan en las colas al detener el pipeline no avisan, así
+        la próxima búsqueda los vuelve a traer.
+        """
+        on_done = item.get("on_done")
+        if on_done is None:
+            return
+        try:
+            await on_done()
+        except Exception as e:
+            print(f"❌ Error al avanzar los cursores del usuario {item.get('user_id')}: {e}")
+
+    async def submit(self, user_id, source_type, source_value, tweets, account=None, on_done=None):
+        """ Entrada del pipeline; espera si la primera cola está llena. """
+        await self.stages[0].queue.put({
+            "user_id": user_id,
+            "account": account,
+            "on_done": on_done,
+            "source_type": source_type,
+            "source_value": source_value,
+            "tweets": tweets,
+            "received_at": time.monotonic(),
+        })
+
+    async def fetch_users(self, user_ids, fetching_event):
+        """ Igual que fetch_tweets_for_users, pero entregando los tweets al pipeline. """
+        return await fetch_tweets_for_users(user_ids, fetching_event, sink=self.submit)
+
+    async def dedupe(self, item):
+        pending = await select_new_tweets(
+            item["user_id"], item["tweets"], collected_limiter.remaining(item["user_id"]), item["account"]
+        )
+        if not pending:
+            return None
+        return {**item, "tweets": pending}
+
+    async def translate(self, item):
+        translated = await translate_for_user(item["user_id"], item["tweets"], item["account"])
+        if not translated:
+            return None
+        target_language, translations = translated
+        return {**item, "target_language": target_language, "translations": translations}
+
+    async def persist(self, item):
+        # Otro lote del mismo usuario pudo haber consumido el límite mientras se traducía
+        tweets = item["tweets"][:collected_limiter.remaining(item["user_id"])]
+        inserted = await persist_translated_tweets(
+            item["user_id"], item["source_type"], item["source_value"],
+            tweets, item["translations"], item["target_language"]
+        )
+        if not inserted:
+            return None
+        return {**item, "inserted": inserted}
+
+    async def post(self, item):
+        user_id = item["user_id"]
+        if self._posting_gate.is_set():
+            return None
+        # Se reservan en post_queue para que un publicador en paralelo no los duplique
+        claimed = await claim_new_posts(user_id, [tweet_id for tweet_id, _ in item["inserted"]])
+        if not claimed:
+            return None
+        await posted_limiter.seed([user_id])
+        before = posted_limiter.used(user_id)
+        await post_tweets_for_user(get_http_session(), user_id, claimed, self._posting_gate)
+
+        posted = max(posted_limiter.used(user_id) - before, 0)
+        if posted:
+            with self._lock:
+                self._posted += posted
+                self._total_latency += (time.monotonic() - item["received_at"]) * posted
+        return None
+
+    def stats(self):
+        with self._lock:
+            posted = self._posted
+            latency = self._total_latency
+        return {
+            "running": self._running,
+            "stages": {stage.name: stage.stats() for stage in self.stages},
+            "posted": posted,
+            "avg_fetch_to_post_seconds": round(latency / posted, 2) if posted else 0,
+        }
+
+
+tweet_pipeline = TweetPipeline()
@@ -0,0 +1,163 @@
+from config import Config
+from services.db_service import run_query_async, quote_literal
+
+# Estados de post_queue: pending → claimed → (se borra al publicarse) | pending (reintento) | failed | duplicate | review
+STATUS_PENDING = "pending"
+STATUS_CLAIMED = "claimed"
+STATUS_FAILED = "failed"
+STATUS_DUPLICATE = "duplicate"
+# No se sabe si se publicó (timeout, 5xx): no se reintenta, queda para revisión manual
+STATUS_REVIEW = "review"
+
+
+async def enqueue_collected_tweets():
+    """
+    Encola los tweets de collected_tweets que todavía no están en post_queue.
+    Los de cada usuario se reparten a lo largo de la hora según su rate_limit
+    (3600 / rate_limit segundos entre publicaciones) a continuación del último
+    ya programado, en lugar de publicarse todos juntos.
+    Devuelve la cantidad de tweets encolados.
+    """
+    spread = "3600.0 / GREATEST(COALESCE(rate_limit, 10), 1)" if Config.POST_QUEUE_SPREAD else "0"
+    query = f"""
+    INSERT INTO post_queue (user_id, tweet_id, due_at)
+    SELECT c.user_id, c.tweet_id::text,
+           GREATEST(NOW(), COALESCE(q.last_due + s.spacing, NOW()))
+           + (ROW_NUMBER() OVER (PARTITION BY c.user_id ORDER BY c.created_at, c.tweet_id) - 1) * s.spacing
+    FROM collected_tweets c
+    JOIN (SELECT id, INTERVAL '1 second' * ({spread}) AS spacing FROM users) s ON s.id = c.user_id
+    LEFT JOIN (
+        SELECT user_id, MAX(due_at) AS last_due FROM post_queue
+        WHERE status IN ('{STATUS_PENDING}', '{STATUS_CLAIMED}')
+        GROUP BY user_id
+    ) q ON q.user_id = c.user_id
+    WHERE NOT EXISTS (
+        SELECT 1 FROM post_queue p WHERE p.user_id = c.user_id AND p.tweet_id = c.tweet_id::text
+    )
+    ON CONFLICT (user_id, tweet_id) DO NOTHING
+    RETURNING id
+    """
+    rows = await run_query_async(query, fetchall=True) or []
+    return len(rows)
+
+
+async def purge_orphaned_entries():
+    """ Quita de la cola los tweets que se borraron de collected_tweets (por ejemplo desde la web). """
+    query = f"""
+    DELETE FROM post_queue p
+    WHERE p.status <> '{STATUS_CLAIMED}'
+    AND NOT EXISTS (
+        SELECT 1 FROM collected_tweets c WHERE c.user_id = p.user_id AND c.tweet_id::text = p.tweet_id
+    )
+    """
+    await run_query_async(query)
+
+
+async def claim_due_posts(user_id, limit):
+    """
+    Reserva hasta limit publicaciones vencidas del usuario con FOR UPDATE SKIP
+    LOCKED, de modo que varios publicadores (por ejemplo, varios workers de
+    gunicorn) nunca tomen la misma fila. Las reservas abandonadas se recuperan
+    pasado POST_QUEUE_CLAIM_TIMEOUT_SECONDS.
+    Devuelve [(queue_id, tweet_id, texto, intentos)].
+    """
+    if limit <= 0:
+        return []
+
+    query = f"""
+    UPDATE post_queue q
+    SET status = '{STATUS_CLAIMED}', claimed_at = NOW(), attempts = q.attempts + 1
+    FROM collected_tweets c
+    WHERE q.id IN (
+        SELECT id FROM post_queue
+        WHERE user_id = {int(user_id)}
+        AND (
+            (status = '{STATUS_PENDING}' AND due_at <= NOW())
+            OR (status = '{STATUS_CLAIMED}' AND claimed_at < NOW() - INTERVAL '{int(Config.POST_QUEUE_CLAIM_TIMEOUT_SECONDS)} seconds')
+        )
+        ORDER BY due_at
+        LIMIT {int(limit)}
+        FOR UPDATE SKIP LOCKED
+    )
+    AND c.user_id = q.user_id AND c.tweet_id::text = q.tweet_id
+    RETURNING q.id, q.tweet_id, c.tweet_text, q.attempts
+    """
+    rows = await run_query_async(query, fetchall=True) or []
+    return [tuple(row) for row in rows]
+
+
+async def claim_new_posts(user_id, tweet_ids):
+    """
+    Encola y reserva de inmediato tweets recién guardados (modo pipeline).
+    Si otro publicador ya los encoló, no se devuelven y los publica él.
+    """
+    tweet_ids = [str(tweet_id) for tweet_id in tweet_ids]
+    if not tweet_ids:
+        return []
+
+    values = ", ".join(
+        f"({int(user_id)}, {quote_literal(tweet_id)}, '{STATUS_CLAIMED}', NOW(), NOW(), 1)" for tweet_id in tweet_ids
+    )
+    query = f"""
+    WITH claimed AS (
+        INSERT INTO post_queue (user_id, tweet_id, status, due_at, claimed_at, attempts)
+        VALUES {values}
+        ON CONFLICT (user_id, tweet_id) DO NOTHING
+        RETURNING id, user_id, tweet_id, attempts
+    )
+    SELECT claimed.id, claimed.tweet_id, c.tweet_text, claimed.attempts
+    FROM claimed
+    JOIN collected_tweets c ON c.user_id = claimed.user_id AND c.tweet_id::text = claimed.tweet_id
+    """
+    rows = await run_query_async(query, fetchall=True) or []
+    return [tuple(row) for row in rows]
+
+
+async def complete_post(queue_id):
+    await run_query_async(f"DELETE FROM post_queue WHERE id = {int(queue_id)}")
+
+
+async def mark_duplicate(queue_id):
+    await run_query_async(
+        f"UPDATE post_queue SET status = '{STATUS_DUPLICATE}', claimed_at = NULL WHERE id = {int(queue_id)}"
+    )
+
+
+async def fail_post(queue_id, attempts, error):
+    """ Reprograma la publicación con espera creciente o la marca como fallida al agotar los intentos. """
+    if attempts >= Config.POST_QUEUE_MAX_ATTEMPTS:
+        query = f"""
+        UPDATE post_queue SET status = '{STATUS_FAILED}', claimed_at = NULL, last_error = {quote_literal(str(error))}
+        WHERE id = {int(queue_id)}
+        """
+    else:
+        delay = int(Config.POST_QUEUE_RETRY_SECONDS * attempts)
+        query = f"""
+        UPDATE post_queue
+        SET status = '{STATUS_PENDING}', claimed_at = NULL, last_error = {quote_literal(str(error))},
+            due_at = NOW() + INTERVAL '{delay} seconds'
+        WHERE id = {int(queue_id)}
+        """
+    await run_query_async(query)
+
+
+async def review_post(queue_id, error):
+    """ Saca de la cola una publicación de resultado incierto, sin reintentarla. """
+    query = f"""
+    UPDATE post_queue SET status = '{STATUS_REVIEW}', claimed_at = NULL, last_error = {quote_literal(str(error))}
+    WHERE id = {int(queue_id)}
+    """
+    await run_query_async(query)
+
+
+async def release_posts(queue_ids):
+    """ Devuelve a la cola, sin contar el intento, las reservas que no llegaron a publicarse. """
+    queue_ids = [int(queue_id) for queue_id in queue_ids]
+    if not queue_ids:
+        return
+    query = f"""
+    UPDATE post_queue
+    SET status = '{STATUS_PENDING}', claimed_at = NULL, attempts = GREATEST(attempts - 1, 0)
+    WHERE id IN ({", ".join(str(queue_id) for queue_id in queue_ids)}) AND status = '{STATUS_CLAIMED}'
+    """
+    await run_query_async(query)
@@ -1,6 +1,11 @@
-import requests
+import asyncio
+import json
+import aiohttp
 from requests_oauthlib import OAuth1Session
-from services.db_service import run_query, log_event
+from services.db_service import run_query_async, log_event_async
+from services.outbound_limiter import outbound_limiters
+from services.credentials import credentials
+from services.http_session import create_http_session
 from config import Config
 import logging
 import os
@@ -8,62 +13,91 @@ import os
 logging.basicConfig(level=logging.INFO)
 
 
-def get_rapidapi_key():
-    query = "SELECT key FROM api_keys WHERE id = 3" 
-    result = run_query(query, fetchone=True)
-    return result[0] if result else None  
+RAPIDAPI_HOST = "twttrapi.p.rapidapi.com"
+CREATE_TWEET_URL = f"https://{RAPIDAPI_HOST}/create-tweet"
 
 
-def post_tweet(user_id, tweet_text):
+async def get_rapidapi_key():
+    return await credentials.get_async("rapidapi")
+
+
+def parse_create_tweet_response(data):
+    """ Extrae id, texto y URL del tweet publicado de la respuesta de RapidAPI. """
+    tweet_data = data["data"]["create_tweet"]["tweet_result"]["result"]
+
+    tweet_id = tweet_data["rest_id"]
+    tweet_text = tweet_data["legacy"]["full_text"]
+    tweet_url = f"https://twitter.com/{tweet_data['core']['user_result']['result']['legacy']['screen_name']}/status/{tweet_id}"
+    return tweet_id, tweet_text, tweet_url
+
+
+async def post_tweet_async(session, user_id, tweet_text):
+    """
+    Publica un tweet usando la sesión aiohttp compartida del publicador.
+    Devuelve (respuesta, status_code) igual que post_tweet. Si el pedido falló
+    de forma ambigua (excepción, 5xx o 200 sin datos), la respuesta incluye
+    "uncertain": True: el tweet pudo haberse publicado y no debe reintentarse.
+    """
     query = f"SELECT session FROM users WHERE id = {user_id}"
-    result = run_query(query, fetchone=True)
+    result = await run_query_async(query, fetchone=True)
 
-    
     if not result:
         error_message = f"❌ Usuario {user_id} no encontrado en la base de datos."
         logging.error(error_message)
-        log_event(user_id, "ERROR", error_message)
+        await log_event_async(user_id, "ERROR", error_message)
         return {"error": "Usuario no encontrado"}, 404
-    
-    session = result[0]
-    
-    rapidapi_key = get_rapidapi_key()
+
+    twttr_session = result[0]
+
+    rapidapi_key = await get_rapidapi_key()
     if not rapidapi_key:
         error_message = "❌ No se pudo obtener la API Key de RapidAPI."
         logging.error(error_message)
-        log_event(user_id, "ERROR", error_message)
+        await log_event_async(user_id, "ERROR", error_message)
         return {"error": "No se pudo obtener la API Key de RapidAPI"}, 500
 
-    url = "https://twttrapi.p.rapidapi.com/create-tweet"
-    
     if isinstance(tweet_text, list):
         tweet_text = " ".join(tweet_text) 
         
     tweet_text = str(tweet_text)
 
-
-    payload = f"tweet_text={tweet_text}"
     headers = {
         "x-rapidapi-key": rapidapi_key,
-        "x-rapidapi-host": "twttrapi.p.rapidapi.com",
+        "x-rapidapi-host": RAPIDAPI_HOST,
         "Content-Type": "application/x-www-form-urlencoded",
-        "twttr-session": session
+        "twttr-session": twttr_session
     }
+    timeout = aiohttp.ClientTimeout(total=Config.RAPIDAPI_TIMEOUT_SECONDS)
+
+    limiter = outbound_limiters["rapidapi"]
 
     try:
-        response = requests.post(url, data=payload, headers=headers )
+        attempt = 0
+        while True:
+            # Leer el cuerpo y liberar la conexión antes de interpretar la respuesta
+            async with limiter.slot():
+                async with session.post(CREATE_TWEET_URL, data={"tweet_text": tweet_text}, headers=headers, timeout=timeout) as response:
+                    limiter.observe(response.headers)
+                    status_code = response.status
+                    response_headers = response.headers
+                    body = await response.read()
 
-        
-        if response.status_code == 200 and "data" in response.json():
-            tweet_data = response.json()["data"]["create_tweet"]["tweet_result"]["result"]
+            # Solo se reintenta el 429: ante un 5xx el tweet podría haberse publicado
+            delay = limiter.retry_delay(attempt, response_headers, status_code) if status_code == 429 else None
+            if delay is None:
+                break
+            print(f"⏳ RapidAPI respondió 429. Reintentando la publicación en {delay:.1f}s...")
+            attempt += 1
+            await asyncio.sleep(delay)
 
-            tweet_id = tweet_data["rest_id"]
-            tweet_text = tweet_data["legacy"]["full_text"]
-            tweet_url = f"https://twitter.com/{tweet_data['core']['user_result']['result']['legacy']['screen_name']}/status/{tweet_id}"
+        response_data = json.loads(body) if body else {}
+
+        if status_code == 200 and "data" in response_data:
+            tweet_id, tweet_text, tweet_url = parse_create_tweet_response(response_data)
 
             success_message = f"✅ Tweet publicado exitosamente: {tweet_text[:50]}..."
             logging.info(success_message)
-            log_event(user_id, "POST", success_message)
+            await log_event_async(user_id, "POST", success_message)
 
             return {
                 "message": "Tweet publicado exitosamente",
@@ -72,15 +106,24 @@ def post_tweet(user_id, tweet_text):
                 "tweet_url": tweet_url
             }, 200
         else:
-            error_data = response.json()
-            error_message = error_data.get("detail", "Error desconocido")
-            full_error_message = f"❌ Error al publicar el tweet: {error_data}"
+            error_message = response_data.get("detail", "Error desconocido")
+            full_error_message = f"❌ Error al publicar el tweet: {response_data}"
             logging.error(full_error_message)
-            log_event(user_id, "ERROR", full_error_message)
-            return {"error": error_message}, response.status_code
+            await log_event_async(user_id, "ERROR", full_error_message)
+            return {"error": error_message, "uncertain": status_code >= 500 or status_code == 200}, status_code
 
     except Exception as e:
         error_message = f"❌ Error inesperado al publicar el tweet: {str(e)}"
         logging.error(error_message)
-        log_event(user_id, "ERROR", error_message)
-        return {"error": str(e)}, 500
\ No newline at end of file
+        await log_event_async(user_id, "ERROR", error_message)
+        return {"error": str(e), "uncertain": True}, 500
+
+
+async def post_tweet_with_new_session(user_id, tweet_text):
+    async with create_http_session() as session:
+        return await post_tweet_async(session, user_id, tweet_text)
+
+
+def post_tweet(user_id, tweet_text):
+    """ Versión síncrona para la ruta /tweets/post_tweet. """
+    return asyncio.run(post_tweet_with_new_session(user_id, tweet_text))
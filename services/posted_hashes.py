@@ -0,0 +1,127 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from config import Config
+from services.db_service import execute_query, run_query_async, quote_literal
+from services.translation_cache import normalize_text
+
+BACKFILL_BATCH_SIZE = 1000
+# Resultado de reserve cuando la consulta falla: no se sabe si el contenido ya se publicó
+RESERVE_FAILED = object()
+
+
+def text_hash(text):
+    """ md5 del texto normalizado (espacios colapsados, sin distinguir mayúsculas). """
+    return hashlib.md5(normalize_text(text).casefold().encode("utf-8")).hexdigest()
+
+
+def backfill_text_hashes(db):
+    """
+    Completa text_hash en las filas existentes de posted_tweets. El hash se
+    calcula en Python para usar exactamente la misma normalización que al publicar.
+    Se ejecuta en la conexión de ensure_schema: los errores se propagan.
+    """
+    total = 0
+    while True:
+        rows = execute_query(
+            db,
+            f"SELECT ctid::text, tweet_text FROM posted_tweets WHERE text_hash IS NULL LIMIT {BACKFILL_BATCH_SIZE}",
+            fetchall=True
+        ) or []
+        if not rows:
+            break
+
+        values = ", ".join(
+            f"({quote_literal(ctid)}::tid, {quote_literal(text_hash(tweet_text or ''))})" for ctid, tweet_text in rows
+        )
+        # Si el UPDATE falla, la excepción corta el ciclo (las mismas filas volverían para siempre)
+        execute_query(db, f"""
+        UPDATE posted_tweets p SET text_hash = v.text_hash
+        FROM (VALUES {values}) AS v(row_id, text_hash)
+        WHERE p.ctid = v.row_id
+        """)
+        total += len(rows)
+
+    if total:
+        print(f"#️⃣ text_hash calculado para {total} tweets publicados.")
+
+
+class PostedHashIndex:
+    """
+    Deduplicación de publicaciones por hash del contenido. La garantía la da el
+    índice único (user_id, text_hash) de posted_tweets: la fila se reserva con
+    INSERT ... ON CONFLICT DO NOTHING antes de publicar. En memoria se guardan
+    los hashes recientes de cada usuario para descartar repetidos sin consultar.
+    """
+
+    def __init__(self, max_per_user):
+        self.max_per_user = max_per_user
+        self._hashes = {}
+        self._lock = threading.Lock()
+
+    def _remember(self, user_id, tweet_hash):
+        """ Requiere el lock. """
+        hashes = self._hashes.setdefault(user_id, OrderedDict())
+        hashes[tweet_hash] = True
+        hashes.move_to_end(tweet_hash)
+        while len(hashes) > self.max_per_user:
+            hashes.popitem(last=False)
+
+    async def _warm(self, user_id):
+        with self._lock:
+            if user_id in self._hashes:
+                return
+
+        query = f"""
+        SELECT text_hash FROM posted_tweets
+        WHERE user_id = '{user_id}' AND text_hash IS NOT NULL
+        ORDER BY created_at DESC
+        LIMIT {int(self.max_per_user)}
+        """
+        rows = await run_query_async(query, fetchall=True) or []
+        with self._lock:
+            if user_id in self._hashes:
+                return
+            self._hashes[user_id] = OrderedDict((row[0], True) for row in reversed(rows))
+
+    async def reserve(self, user_id, tweet_text):
+        """
+        Registra el tweet en posted_tweets antes de publicarlo. Devuelve el hash,
+        None si el usuario ya publicó (o está publicando) ese contenido, o
+        RESERVE_FAILED si la consulta falló.
+        """
+        tweet_hash = text_hash(tweet_text)
+        await self._warm(user_id)
+        with self._lock:
+            if tweet_hash in self._hashes[user_id]:
+                return None
+
+        # El conteo distingue el conflicto (0) de un error de la consulta (None)
+        query = f"""
+        WITH inserted AS (
+            INSERT INTO posted_tweets (user_id, tweet_text, text_hash, created_at)
+            VALUES ('{user_id}', {quote_literal(tweet_text)}, {quote_literal(tweet_hash)}, NOW())
+            ON CONFLICT (user_id, text_hash) DO NOTHING
+            RETURNING text_hash
+        )
+        SELECT COUNT(*) FROM inserted
+        """
+        row = await run_query_async(query, fetchone=True)
+        if row is None:
+            return RESERVE_FAILED
+        if not row[0]:
+            return None
+        with self._lock:
+            self._remember(user_id, tweet_hash)
+        return tweet_hash
+
+    async def release(self, user_id, tweet_hash):
+        """ Anula la reserva si la publicación falló, para poder reintentarla. """
+        with self._lock:
+            self._hashes.get(user_id, {}).pop(tweet_hash, None)
+        await run_query_async(
+            f"DELETE FROM posted_tweets WHERE user_id = '{user_id}' AND text_hash = {quote_literal(tweet_hash)}"
+        )
+
+
+posted_hash_index = PostedHashIndex(Config.POSTED_HASH_CACHE_SIZE)
@@ -0,0 +1,91 @@
+from config import Config
+
+# Espacio reservado para el " since_id:<id>" que agrega el cursor de cada consulta
+SINCE_ID_RESERVE = len(" since_id:") + 19
+
+
+def or_group(terms):
+    if len(terms) == 1:
+        return terms[0]
+    return "(" + " OR ".join(terms) + ")"
+
+
+def handles_part(handles):
+    return or_group([f"from:{handle}" for handle in handles])
+
+
+def keywords_part(keywords):
+    return or_group(list(keywords))
+
+
+def build_query(handles, keywords):
+    """
+    Consulta factorizada: (from:a OR from:b ...) (k1 OR k2 ...).
+    Equivale a repetir la lista de keywords para cada usuario, pero crece
+    como usuarios + keywords en lugar de usuarios × keywords.
+    """
+    if not keywords:
+        return handles_part(handles)
+    return f"{handles_part(handles)} {keywords_part(keywords)}"
+
+
+def pack(items, render, budget):
+    """ Agrupa items de forma greedy para que render(grupo) no supere budget. """
+    groups = []
+    current = []
+    for item in items:
+        if current and len(render(current + [item])) > budget:
+            groups.append(current)
+            current = []
+        current.append(item)
+    if current:
+        groups.append(current)
+    return groups
+
+
+def plan_queries(handles, keywords, max_length=None):
+    """
+    Divide la consulta factorizada en shards que respetan el largo máximo
+    (dejando lugar para since_id). Cada combinación de usuarios y keywords
+    queda cubierta por exactamente un shard.
+    """
+    handles = list(dict.fromkeys(handles))
+    keywords = list(dict.fromkeys(keywords))
+    if not handles:
+        return []
+
+    budget = (max_length or Config.SOCIALDATA_MAX_QUERY_LENGTH) - SINCE_ID_RESERVE
+    for term in [f"from:{handle}" for handle in handles] + keywords:
+        if len(term) > budget // 2:
+            print(f"⚠ El término '{term[:50]}' ocupa más de la mitad del largo máximo de la consulta.")
+
+    if not keywords:
+        return [build_query(group, []) for group in pack(handles, handles_part, budget)]
+
+    # Se prueba cuánto del largo se reserva a las keywords y se elige el
+    # reparto que genera menos shards
+    longest_handle = max(len(handles_part([handle])) for handle in handles)
+    max_keyword_budget = max(budget - longest_handle - 1, 1)
+    candidates = {len(keywords_part(keywords)), max_keyword_budget}
+    candidates.update(budget * step // 20 for step in range(2, 19))
+
+    best = None
+    for keyword_budget in sorted(candidates):
+        keyword_budget = min(max(keyword_budget, 1), max_keyword_budget)
+        queries = []
+        for keyword_group in pack(keywords, keywords_part, keyword_budget):
+            handle_budget = budget - len(keywords_part(keyword_group)) - 1
+            for handle_group in pack(handles, handles_part, handle_budget):
+                queries.append(build_query(handle_group, keyword_group))
+        if best is None or len(queries) < len(best):
+            best = queries
+    return best
+
+
+def merge_results(results):
+    """ Une los tweets de todos los shards, sin duplicados por id_str y del más nuevo al más viejo. """
+    merged = {}
+    for tweets in results:
+        for tweet in tweets:
+            merged.setdefault(tweet["id_str"], tweet)
+    return sorted(merged.values(), key=lambda tweet: int(tweet["id_str"]), reverse=True)
@@ -0,0 +1,137 @@
+import threading
+import time
+from collections import deque
+from services.db_service import run_query_async, quote_literal
+
+DEFAULT_TWEET_LIMIT_PER_HOUR = 10
+
+
+class SlidingWindowLimiter:
+    """
+    Límite de tweets por hora de cada usuario (columna users.rate_limit) con
+    una ventana deslizante en memoria: por usuario se guarda una cola con el
+    instante de cada tweet que cuenta dentro de la ventana.
+    Se siembra desde la base una vez por ciclo y luego se actualiza en memoria
+    en cada guardado o publicación, sin consultas COUNT(*) por tweet.
+    """
+
+    def __init__(self, table, window_seconds=3600, default_limit=DEFAULT_TWEET_LIMIT_PER_HOUR):
+        self.table = table
+        self.window_seconds = window_seconds
+        self.default_limit = default_limit
+        self._limits = {}
+        self._events = {}
+        self._lock = threading.Lock()
+
+    async def seed(self, user_ids=None, limits=None):
+        """
+        Carga el límite y los tweets de la última hora de los usuarios indicados
+        (o de todos) con dos consultas. Las edades se calculan en la base para no
+        depender de que los relojes coincidan. Si ya se conocen los límites
+        ({user_id: rate_limit}, por ejemplo del snapshot de cuentas) no se consultan.
+        """
+        if user_ids is not None:
+            user_ids = [int(user_id) for user_id in user_ids]
+            if not user_ids:
+                return
+            id_list = ", ".join(quote_literal(str(user_id)) for user_id in user_ids)
+            users_filter = f"WHERE id IN ({id_list})"
+            events_filter = f"AND user_id IN ({id_list})"
+        else:
+            users_filter = ""
+            events_filter = ""
+
+        events_query = f"""
+        SELECT user_id, EXTRACT(EPOCH FROM NOW() - created_at) FROM {self.table}
+        WHERE created_at >= NOW() - INTERVAL '{int(self.window_seconds)} seconds'
+        {events_filter}
+        """
+        if limits is not None:
+            limit_rows = list(limits.items())
+        else:
+            limit_rows = await run_query_async(f"SELECT id, rate_limit FROM users {users_filter}", fetchall=True) or []
+        event_rows = await run_query_async(events_query, fetchall=True) or []
+
+        now = time.monotonic()
+        events = {int(user_id): [] for user_id, _ in limit_rows}
+        for user_id, age in event_rows:
+            events.setdefault(int(user_id), []).append(now - max(float(age), 0))
+
+        with self._lock:
+            if user_ids is None:
+                self._limits = {}
+                self._events = {}
+            for user_id, rate_limit in limit_rows:
+                self._limits[int(user_id)] = rate_limit or self.default_limit
+            for user_id, timestamps in events.items():
+                self._events[user_id] = deque(sorted(timestamps))
+
+    def set_limit(self, user_id, rate_limit):
+        """ Actualiza el límite de un usuario sin volver a sembrar. """
+        with self._lock:
+            self._limits[int(user_id)] = rate_limit or self.default_limit
+
+    def forget(self, user_id):
+        """ Descarta el estado de un usuario eliminado. """
+        with self._lock:
+            self._limits.pop(int(user_id), None)
+            self._events.pop(int(user_id), None)
+
+    def _prune(self, user_id, now):
+        """ Descarta los instantes que salieron de la ventana. Requiere el lock. """
+        events = self._events.setdefault(user_id, deque())
+        cutoff = now - self.window_seconds
+        while events and events[0] < cutoff:
+            events.popleft()
+        return events
+
+    def limit(self, user_id):
+        with self._lock:
+            return self._limits.get(int(user_id), self.default_limit)
+
+    def used(self, user_id):
+        with self._lock:
+            return len(self._prune(int(user_id), time.monotonic()))
+
+    def remaining(self, user_id):
+        with self._lock:
+            user_id = int(user_id)
+            used = len(self._prune(user_id, time.monotonic()))
+            return max(self._limits.get(user_id, self.default_limit) - used, 0)
+
+    def record(self, user_id, count=1, ages=None):
+        """
+        Registra tweets guardados o publicados. ages permite indicar la
+        antigüedad en segundos de cada uno (por defecto, ahora).
+        """
+        if ages is None:
+            ages = [0] * count
+        if not ages:
+            return
+
+        now = time.monotonic()
+        with self._lock:
+            events = self._prune(int(user_id), now)
+            timestamps = [now - max(float(age), 0) for age in ages]
+            if events and min(timestamps) < events[-1]:
+                timestamps = sorted(list(events) + timestamps)
+                events.clear()
+            else:
+                timestamps.sort()
+            events.extend(timestamps)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                str(user_id): {
+                    "limit": self._limits.get(user_id, self.default_limit),
+                    "used": len(self._prune(user_id, now)),
+                }
+                for user_id in set(self._limits) | set(self._events)
+            }
+
+
+# Tweets recolectados (collected_tweets) y tweets publicados (posted_tweets) por hora
+collected_limiter = SlidingWindowLimiter("collected_tweets")
+posted_limiter = SlidingWindowLimiter("posted_tweets")
@@ -0,0 +1,250 @@
+import asyncio
+import heapq
+import threading
+import time
+from config import Config
+
+
+class AdaptiveScheduler:
+    """
+    Planificador de la recolección por usuario. Mantiene una cola de prioridad
+    de (próxima_ejecución, user_id) y despacha a cada usuario cuando le toca,
+    sin esperar al resto. El intervalo de cada usuario se adapta a la cantidad
+    de tweets nuevos que produjeron sus fuentes (promedio móvil exponencial),
+    entre un mínimo y un máximo configurables. Las cuentas que comparten una
+    fuente (mismo grupo) se despachan juntas cuando vence cualquiera de ellas,
+    así la fuente se sigue consultando una sola vez para todas.
+    """
+
+    def __init__(self, min_interval, max_interval, max_concurrency, smoothing, users_refresh_seconds):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.max_concurrency = max_concurrency
+        self.smoothing = smoothing
+        self.users_refresh_seconds = users_refresh_seconds
+
+        self._lock = threading.Lock()
+        self._heap = []
+        self._users = set()
+        self._groups = {}
+        self._members = {}
+        self._due = {}
+        self._activity = {}
+        self._intervals = {}
+        self._in_flight = set()
+        self._dispatches = 0
+        self._refresh_requested = False
+
+    def sync_users(self, user_groups):
+        """
+        Agrega los usuarios nuevos (pendientes ya mismo), quita los que ya no
+        existen y actualiza el grupo de cada uno. user_groups es {user_id: grupo}.
+        """
+        user_ids = set(user_groups)
+        now = time.monotonic()
+        with self._lock:
+            for user_id in user_ids - self._users:
+                if user_id not in self._in_flight:
+                    self._schedule(user_id, now)
+            for user_id in self._users - user_ids:
+                self._forget(user_id)
+            self._users = user_ids
+            for user_id, group in user_groups.items():
+                self._set_group(user_id, group)
+
+    def set_group(self, user_id, group):
+        """ Cambia el grupo de un usuario (por ejemplo, al editar sus fuentes). """
+        with self._lock:
+            if user_id in self._users:
+                self._set_group(user_id, group)
+
+    def _set_group(self, user_id, group):
+        """ Requiere el lock. """
+        previous = self._groups.get(user_id)
+        if previous == group and user_id in self._groups:
+            return
+        if user_id in self._groups:
+            members = self._members.get(previous, set())
+            members.discard(user_id)
+            if not members:
+                self._members.pop(previous, None)
+        self._groups[user_id] = group
+        self._members.setdefault(group, set()).add(user_id)
+
+    def add_user(self, user_id, delay=0, group=None):
+        """ Programa (o adelanta) la próxima recolección de un usuario y actualiza su grupo. """
+        with self._lock:
+            self._users.add(user_id)
+            if group is not None:
+                self._set_group(user_id, group)
+            due_at = time.monotonic() + delay
+            if user_id not in self._in_flight and due_at < self._due.get(user_id, float("inf")):
+                self._schedule(user_id, due_at)
+
+    def request_users_refresh(self):
+        """ Fuerza una recarga completa de usuarios en la próxima vuelta del bucle. """
+        with self._lock:
+            self._refresh_requested = True
+
+    def _take_refresh_request(self):
+        with self._lock:
+            requested = self._refresh_requested
+            self._refresh_requested = False
+            return requested
+
+    def remove_user(self, user_id):
+        with self._lock:
+            self._users.discard(user_id)
+            self._forget(user_id)
+
+    def _forget(self, user_id):
+        """ Requiere el lock. Las entradas viejas del heap se descartan al salir. """
+        group = self._groups.pop(user_id, None)
+        members = self._members.get(group)
+        if members is not None:
+            members.discard(user_id)
+            if not members:
+                del self._members[group]
+        self._due.pop(user_id, None)
+        self._activity.pop(user_id, None)
+        self._intervals.pop(user_id, None)
+
+    def _schedule(self, user_id, due_at):
+        """ Requiere el lock. """
+        self._due[user_id] = due_at
+        heapq.heappush(self._heap, (due_at, user_id))
+
+    def next_interval(self, user_id, new_tweets):
+        """ Actualiza la actividad del usuario y devuelve su próximo intervalo. """
+        with self._lock:
+            activity = self._activity.get(user_id, 0.0)
+            activity = self.smoothing * new_tweets + (1 - self.smoothing) * activity
+            self._activity[user_id] = activity
+            interval = min(max(self.max_interval / (1 + activity), self.min_interval), self.max_interval)
+            self._intervals[user_id] = interval
+            return interval
+
+    def pop_due(self, limit):
+        """
+        Saca hasta limit usuarios cuya próxima ejecución ya pasó, junto con los
+        demás usuarios de su grupo que no estén en curso (esos no cuentan para
+        limit: no agregan consultas, comparten la de su grupo).
+        """
+        now = time.monotonic()
+        due = []
+        taken = 0
+        with self._lock:
+            while self._heap and taken < limit:
+                due_at, user_id = self._heap[0]
+                if self._due.get(user_id) != due_at:
+                    heapq.heappop(self._heap)
+                    continue
+                if due_at > now:
+                    break
+                heapq.heappop(self._heap)
+                taken += 1
+                riders = self._members.get(self._groups.get(user_id), set()) if user_id in self._groups else set()
+                for member in [user_id] + sorted(riders - {user_id}):
+                    if member in self._in_flight or (member != user_id and member not in self._due):
+                        continue
+                    self._due.pop(member, None)
+                    self._in_flight.add(member)
+                    due.append(member)
+            self._dispatches += len(due)
+        return due
+
+    def seconds_until_next(self):
+        with self._lock:
+            while self._heap and self._due.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return max(self._heap[0][0] - time.monotonic(), 0)
+
+    def complete(self, user_id, new_tweets):
+        interval = self.next_interval(user_id, new_tweets)
+        with self._lock:
+            self._in_flight.discard(user_id)
+            if user_id in self._users:
+                self._schedule(user_id, time.monotonic() + interval)
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._in_flight)
+
+    async def run(self, dispatch, load_user_groups, stop_event):
+        """
+        Bucle principal: despacha a los usuarios a medida que les toca, con a lo
+        sumo max_concurrency usuarios en curso. Los que vencen juntos se envían en
+        una misma llamada a dispatch(user_ids) -> {user_id: tweets nuevos}, así
+        las fuentes compartidas se siguen consultando una sola vez.
+        """
+        tasks = set()
+        users_loaded_at = None
+
+        async def run_batch(user_ids):
+            results = {}
+            try:
+                results = await dispatch(user_ids, stop_event) or {}
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"❌ Error al recolectar tweets de {user_ids}: {e}")
+            finally:
+                for user_id in user_ids:
+                    self.complete(user_id, results.get(user_id, 0))
+
+        while not stop_event.is_set():
+            refresh_requested = self._take_refresh_request()
+            if refresh_requested or users_loaded_at is None or time.monotonic() - users_loaded_at >= self.users_refresh_seconds:
+                try:
+                    self.sync_users(await load_user_groups())
+                except Exception as e:
+                    print(f"❌ Error al cargar los usuarios del planificador: {e}")
+                users_loaded_at = time.monotonic()
+
+            due = self.pop_due(self.max_concurrency - self.in_flight())
+            if due:
+                print(f"⏰ Usuarios pendientes de recolección: {due}")
+                tasks.add(asyncio.create_task(run_batch(due)))
+
+            # Dormir hasta el próximo vencimiento o hasta que termine alguna tarea,
+            # revisando cada segundo si se pidió detener el servicio
+            wait = self.seconds_until_next()
+            wait = 1.0 if wait is None else min(wait, 1.0)
+            if self.in_flight() >= self.max_concurrency:
+                wait = 1.0
+            if tasks:
+                done, tasks = await asyncio.wait(tasks, timeout=wait, return_when=asyncio.FIRST_COMPLETED)
+            else:
+                await asyncio.sleep(wait)
+
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self):
+        now = time.monotonic()
+        with self._lock:
+            return {
+                "users": len(self._users),
+                "in_flight": len(self._in_flight),
+                "max_concurrency": self.max_concurrency,
+                "dispatches": self._dispatches,
+                "schedule": {
+                    str(user_id): {
+                        "next_in_seconds": round(max(due_at - now, 0), 1),
+                        "interval_seconds": round(self._intervals.get(user_id, self.min_interval), 1),
+                        "activity": round(self._activity.get(user_id, 0.0), 2),
+                    }
+                    for user_id, due_at in self._due.items()
+                },
+            }
+
+
+fetch_scheduler = AdaptiveScheduler(
+    Config.FETCH_MIN_INTERVAL_SECONDS,
+    Config.FETCH_MAX_INTERVAL_SECONDS,
+    Config.FETCH_MAX_CONCURRENT_USERS,
+    Config.FETCH_ACTIVITY_SMOOTHING,
+    Config.FETCH_USERS_REFRESH_SECONDS
+)
@@ -0,0 +1,186 @@
+import threading
+import pg8000.native as pg
+from services.db_service import db_pool, execute_query
+from services.posted_hashes import backfill_text_hashes
+
+# Tablas e índices que usan los servicios en segundo plano.
+# Todas las sentencias son idempotentes para poder ejecutarlas en cada arranque.
+# Los pasos que requieren Python (por ejemplo, backfills) se indican como funciones
+# que reciben la conexión.
+SCHEMA_STATEMENTS = [
+    """
+    CREATE TABLE IF NOT EXISTS translation_cache (
+        key_hash TEXT PRIMARY KEY,
+        translated_text TEXT NOT NULL,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    # Ingesta idempotente: se eliminan duplicados previos antes de crear el índice único
+    """
+    DELETE FROM collected_tweets a
+    USING collected_tweets b
+    WHERE a.ctid > b.ctid AND a.tweet_id = b.tweet_id AND a.user_id = b.user_id
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS collected_tweets_tweet_user_idx
+    ON collected_tweets (tweet_id, user_id)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS seen_tweets (
+        user_id INTEGER NOT NULL,
+        tweet_id BIGINT NOT NULL,
+        seen_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (user_id, tweet_id)
+    )
+    """,
+    """
+    INSERT INTO seen_tweets (user_id, tweet_id)
+    SELECT DISTINCT user_id, tweet_id::text::bigint FROM collected_tweets
+    WHERE user_id IS NOT NULL
+    AND CASE WHEN tweet_id::text ~ '^[0-9]{1,19}$'
+        THEN tweet_id::text::numeric <= 9223372036854775807 ELSE FALSE END
+    ON CONFLICT (user_id, tweet_id) DO NOTHING
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS fetch_cursors (
+        scope TEXT NOT NULL,
+        query_key TEXT NOT NULL,
+        since_id BIGINT NOT NULL,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        PRIMARY KEY (scope, query_key)
+    )
+    """,
+    # Cola de publicación durable: los publicadores reservan filas con FOR UPDATE SKIP LOCKED
+    """
+    CREATE TABLE IF NOT EXISTS post_queue (
+        id BIGSERIAL PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        tweet_id TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending',
+        due_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        attempts INTEGER NOT NULL DEFAULT 0,
+        last_error TEXT,
+        claimed_at TIMESTAMP,
+        created_at TIMESTAMP NOT NULL DEFAULT NOW(),
+        UNIQUE (user_id, tweet_id)
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS post_queue_status_due_idx
+    ON post_queue (status, due_at)
+    """,
+    # Deduplicación de publicaciones por hash del contenido normalizado
+    """
+    ALTER TABLE posted_tweets ADD COLUMN IF NOT EXISTS text_hash TEXT
+    """,
+    backfill_text_hashes,
+    """
+    DELETE FROM posted_tweets a
+    USING posted_tweets b
+    WHERE a.ctid > b.ctid AND a.user_id = b.user_id AND a.text_hash = b.text_hash
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS posted_tweets_user_text_hash_idx
+    ON posted_tweets (user_id, text_hash)
+    """,
+    # Filtros de contenido por cuenta; NULL = valor por defecto de Config
+    """
+    CREATE TABLE IF NOT EXISTS account_filters (
+        user_id INTEGER PRIMARY KEY,
+        skip_retweets BOOLEAN,
+        skip_replies BOOLEAN,
+        skip_quotes BOOLEAN,
+        min_length INTEGER,
+        skip_url_only BOOLEAN,
+        blocked_terms TEXT[],
+        max_translated_length INTEGER,
+        updated_at TIMESTAMP NOT NULL DEFAULT NOW()
+    )
+    """,
+    # Aviso de cambios de cuentas (canal account_changes). El argumento del
+    # trigger indica la columna que identifica la cuenta (o la API key).
+    """
+    CREATE OR REPLACE FUNCTION notify_account_change() RETURNS trigger AS $$
+    DECLARE
+        row_data JSONB;
+    BEGIN
+        IF TG_OP = 'DELETE' THEN
+            row_data := to_jsonb(OLD);
+        ELSE
+            row_data := to_jsonb(NEW);
+        END IF;
+        PERFORM pg_notify('account_changes', json_build_object(
+            'table', TG_TABLE_NAME,
+            'op', TG_OP,
+            'id', row_data ->> TG_ARGV[0]
+        )::text);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    # Los triggers se crean solo si faltan: recrearlos en cada arranque bloquearía las tablas
+    *[
+        f"""
+        DO $$
+        BEGIN
+            IF NOT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgname = '{table}_account_changes' AND tgrelid = '{table}'::regclass
+            ) THEN
+                CREATE TRIGGER {table}_account_changes
+                AFTER INSERT OR UPDATE OR DELETE ON {table}
+                FOR EACH ROW EXECUTE PROCEDURE notify_account_change('{column}');
+            END IF;
+        END
+        $$
+        """
+        for table, column in (
+            ("users", "id"),
+            ("monitored_users", "user_id"),
+            ("user_keywords", "user_id"),
+            ("api_keys", "id"),
+            ("account_filters", "user_id"),
+        )
+    ],
+]
+
+# Clave del advisory lock que serializa ensure_schema entre procesos
+SCHEMA_LOCK_KEY = 7283001
+
+_schema_lock = threading.Lock()
+_schema_ready = False
+
+
+def ensure_schema():
+    """
+    Crea las tablas auxiliares si no existen. Solo se ejecuta una vez por proceso,
+    y solo se da por hecho si todas las sentencias terminaron bien: ante un error
+    se lanza la excepción y el próximo llamado vuelve a intentarlo.
+    """
+    global _schema_ready
+
+    with _schema_lock:
+        if _schema_ready:
+            return
+
+        # A diferencia de run_query, execute_query no oculta los errores
+        db = db_pool.acquire()
+        broken = False
+        try:
+            execute_query(db, f"SELECT pg_advisory_lock({SCHEMA_LOCK_KEY})")
+            try:
+                for statement in SCHEMA_STATEMENTS:
+                    if callable(statement):
+                        statement(db)
+                    else:
+                        execute_query(db, statement)
+            finally:
+                execute_query(db, f"SELECT pg_advisory_unlock({SCHEMA_LOCK_KEY})")
+        except pg.InterfaceError:
+            broken = True
+            raise
+        finally:
+            db_pool.release(db, broken=broken)
+
+        _schema_ready = True
+        print("🗄️ Esquema auxiliar verificado.")
@@ -0,0 +1,59 @@
+import threading
+from config import Config
+from services.db_service import run_query_async
+
+
+class SeenTweetIndex:
+    """
+    Índice persistente de los tweets ya ingeridos por cada usuario.
+    La tabla seen_tweets conserva los ids aunque el tweet se borre de
+    collected_tweets al publicarse; en memoria se guarda un set de enteros
+    por usuario que se precarga al iniciar el recolector.
+    """
+
+    def __init__(self, retention_days):
+        self.retention_days = retention_days
+        self._seen = {}
+        self._lock = threading.Lock()
+
+    async def warm(self):
+        query = f"""
+        SELECT user_id, tweet_id FROM seen_tweets
+        WHERE seen_at >= NOW() - INTERVAL '{int(self.retention_days)} days'
+        """
+        rows = await run_query_async(query, fetchall=True) or []
+
+        seen = {}
+        for user_id, tweet_id in rows:
+            seen.setdefault(user_id, set()).add(int(tweet_id))
+
+        with self._lock:
+            self._seen = seen
+        print(f"🧠 Índice de tweets vistos cargado: {len(rows)} ids para {len(seen)} usuarios.")
+
+    def filter_unseen(self, user_id, tweets):
+        """ Descarta los tweets (dicts de SocialData) que el usuario ya ingirió. """
+        with self._lock:
+            seen = self._seen.get(user_id)
+            if not seen:
+                return list(tweets)
+            return [tweet for tweet in tweets if int(tweet["id_str"]) not in seen]
+
+    async def mark_seen(self, user_id, tweet_ids):
+        tweet_ids = {int(tweet_id) for tweet_id in tweet_ids}
+        if not tweet_ids:
+            return
+
+        with self._lock:
+            self._seen.setdefault(user_id, set()).update(tweet_ids)
+
+        values = ", ".join(f"({user_id}, {tweet_id}, NOW())" for tweet_id in tweet_ids)
+        query = f"""
+        INSERT INTO seen_tweets (user_id, tweet_id, seen_at)
+        VALUES {values}
+        ON CONFLICT (user_id, tweet_id) DO NOTHING
+        """
+        await run_query_async(query)
+
+
+seen_tweet_index = SeenTweetIndex(Config.SEEN_TWEETS_RETENTION_DAYS)
@@ -0,0 +1,177 @@
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+from config import Config
+
+FINGERPRINT_BITS = 64
+
+URL_PATTERN = re.compile(r"https?://\S+")
+RETWEET_PREFIX = re.compile(r"^rt @\w+:\s*")
+TOKEN_PATTERN = re.compile(r"\w+", re.UNICODE)
+
+
+def tweet_fingerprint_text(tweet):
+    """ Para un retweet se usa el texto original; para el resto, el del tweet. """
+    retweeted = tweet.get("retweeted_status") or {}
+    return retweeted.get("full_text") or tweet.get("full_text") or ""
+
+
+def features(text):
+    """ Palabras y pares de palabras del texto, sin URLs ni el prefijo "RT @usuario:". """
+    text = RETWEET_PREFIX.sub("", URL_PATTERN.sub(" ", text.lower()))
+    words = [word for word in TOKEN_PATTERN.findall(text) if len(word) > 1]
+    return words + [f"{first} {second}" for first, second in zip(words, words[1:])]
+
+
+def feature_hash(feature):
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+
+def simhash(text):
+    """
+    Huella SimHash de 64 bits: textos parecidos difieren en pocos bits.
+    Devuelve None si el texto no tiene palabras (solo enlaces, emojis...):
+    todos esos textos tendrían la misma huella sin parecerse en nada.
+    """
+    text_features = features(text)
+    if not text_features:
+        return None
+
+    weights = [0] * FINGERPRINT_BITS
+    for feature in text_features:
+        value = feature_hash(feature)
+        for bit in range(FINGERPRINT_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+
+def hamming_distance(first, second):
+    return (first ^ second).bit_count()
+
+
+class NearDuplicateIndex:
+    """
+    Índice LSH por bandas de las huellas SimHash recientes de cada usuario.
+    La huella se divide en bandas; dos huellas a distancia de Hamming menor
+    que la cantidad de bandas comparten al menos una banda, así que solo se
+    comparan los candidatos de los mismos buckets.
+    """
+
+    def __init__(self, max_distance, bands, window_seconds, max_per_user):
+        self.max_distance = max_distance
+        self.bands = bands
+        self.band_bits = FINGERPRINT_BITS // bands
+        self.window_seconds = window_seconds
+        self.max_per_user = max_per_user
+
+        if max_distance >= bands:
+            print(f"⚠ Con {bands} bandas SimHash no se garantiza detectar distancias mayores a {bands - 1}.")
+
+        self._lock = threading.Lock()
+        self._buckets = {}
+        self._recent = {}
+        self._dropped = 0
+        self._checked = 0
+
+    def _band_keys(self, fingerprint):
+        mask = (1 << self.band_bits) - 1
+        return [(band, fingerprint >> (band * self.band_bits) & mask) for band in range(self.bands)]
+
+    def _evict(self, user_id, now):
+        """ Quita las huellas vencidas o que exceden el máximo por usuario. Requiere el lock. """
+        recent = self._recent.setdefault(user_id, deque())
+        buckets = self._buckets.setdefault(user_id, {})
+        while recent and (now - recent[0][0] > self.window_seconds or len(recent) > self.max_per_user):
+            _, fingerprint = recent.popleft()
+            for key in self._band_keys(fingerprint):
+                bucket = buckets.get(key)
+                if bucket is None:
+                    continue
+                bucket.discard(fingerprint)
+                if not bucket:
+                    del buckets[key]
+
+    def _find_similar(self, user_id, fingerprint):
+        """ Requiere el lock. """
+        buckets = self._buckets.get(user_id, {})
+        for key in self._band_keys(fingerprint):
+            for candidate in buckets.get(key, ()):
+                if hamming_distance(candidate, fingerprint) <= self.max_distance:
+                    return candidate
+        return None
+
+    def _add(self, user_id, fingerprint, now):
+        """ Requiere el lock. """
+        self._recent.setdefault(user_id, deque()).append((now, fingerprint))
+        buckets = self._buckets.setdefault(user_id, {})
+        for key in self._band_keys(fingerprint):
+            buckets.setdefault(key, set()).add(fingerprint)
+
+    def filter_batch(self, user_id, tweets, limit=None):
+        """
+        Procesa una página completa: calcula las huellas y descarta los tweets
+        casi iguales a uno reciente (o a otro aceptado de la misma página), hasta
+        limit. No registra nada: las huellas se agregan con register recién
+        cuando el tweet se guarda, así un tweet que falla al traducirse o
+        guardarse no se descarta como duplicado de sí mismo al volver.
+        Los tweets sin huella se aceptan sin compararlos.
+        Devuelve (aceptados, descartados).
+        """
+        fingerprints = [simhash(tweet_fingerprint_text(tweet)) for tweet in tweets]
+
+        accepted = []
+        dropped = []
+        page = []
+        with self._lock:
+            self._evict(user_id, time.monotonic())
+            for tweet, fingerprint in zip(tweets, fingerprints):
+                if limit is not None and len(accepted) >= limit:
+                    break
+                self._checked += 1
+                if fingerprint is None:
+                    accepted.append(tweet)
+                    continue
+                if self._find_similar(user_id, fingerprint) is not None or any(
+                    hamming_distance(other, fingerprint) <= self.max_distance for other in page
+                ):
+                    dropped.append(tweet)
+                    continue
+                page.append(fingerprint)
+                accepted.append(tweet)
+            self._dropped += len(dropped)
+        return accepted, dropped
+
+    def register(self, user_id, tweets):
+        """ Agrega las huellas de los tweets ya guardados en collected_tweets. """
+        fingerprints = [simhash(tweet_fingerprint_text(tweet)) for tweet in tweets]
+        now = time.monotonic()
+        with self._lock:
+            for fingerprint in fingerprints:
+                if fingerprint is not None:
+                    self._add(user_id, fingerprint, now)
+            self._evict(user_id, now)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "checked": self._checked,
+                "dropped": self._dropped,
+                "fingerprints": sum(len(recent) for recent in self._recent.values()),
+                "max_distance": self.max_distance,
+                "bands": self.bands,
+            }
+
+
+near_duplicate_index = NearDuplicateIndex(
+    Config.SIMHASH_MAX_DISTANCE,
+    Config.SIMHASH_BANDS,
+    Config.SIMHASH_WINDOW_HOURS * 3600,
+    Config.SIMHASH_MAX_PER_USER
+)
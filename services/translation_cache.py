@@ -0,0 +1,126 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from config import Config
+from services.db_service import run_query_async
+
+
+def normalize_text(text):
+    """ Normaliza espacios para que variaciones triviales compartan la misma entrada. """
+    return " ".join(str(text).split())
+
+
+def translation_key(text, target_language, custom_style):
+    raw = "\x1f".join([
+        normalize_text(text),
+        normalize_text(target_language or "").lower(),
+        normalize_text(custom_style or ""),
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """
+    Caché de traducciones en dos niveles: un LRU en memoria con TTL
+    y la tabla translation_cache en Postgres.
+    """
+
+    def __init__(self, max_entries, ttl_seconds, db_ttl_days):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.db_ttl_days = db_ttl_days
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    def _get_from_memory(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        translated_text, expires_at = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return translated_text
+
+    def _store_in_memory(self, key, translated_text):
+        self._entries[key] = (translated_text, time.monotonic() + self.ttl_seconds)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    async def get_many(self, keys):
+        """ Devuelve {key: traducción} con las claves encontradas en memoria o en la base de datos. """
+        found = {}
+        missing = []
+        with self._lock:
+            for key in set(keys):
+                translated_text = self._get_from_memory(key)
+                if translated_text is None:
+                    missing.append(key)
+                else:
+                    found[key] = translated_text
+            self.memory_hits += len(found)
+
+        if missing:
+            query = f"""
+            SELECT key_hash, translated_text FROM translation_cache
+            WHERE key_hash = ANY(:keys)
+            AND created_at >= NOW() - INTERVAL '{int(self.db_ttl_days)} days'
+            """
+            rows = await run_query_async(query, {"keys": missing}, fetchall=True) or []
+            with self._lock:
+                for key, translated_text in rows:
+                    found[key] = translated_text
+                    self._store_in_memory(key, translated_text)
+                self.db_hits += len(rows)
+                self.misses += len(missing) - len(rows)
+
+        return found
+
+    async def set_many(self, translations):
+        """ Guarda {key: traducción} en memoria y en la tabla translation_cache. """
+        if not translations:
+            return
+
+        with self._lock:
+            for key, translated_text in translations.items():
+                self._store_in_memory(key, translated_text)
+
+        values = []
+        params = {}
+        for index, (key, translated_text) in enumerate(translations.items()):
+            values.append(f"(:key{index}, :text{index}, NOW())")
+            params[f"key{index}"] = key
+            params[f"text{index}"] = translated_text
+
+        query = f"""
+        INSERT INTO translation_cache (key_hash, translated_text, created_at)
+        VALUES {", ".join(values)}
+        ON CONFLICT (key_hash) DO UPDATE
+        SET translated_text = EXCLUDED.translated_text, created_at = EXCLUDED.created_at
+        """
+        await run_query_async(query, params)
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.db_hits
+            lookups = hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._entries),
+            }
+
+
+translation_cache = TranslationCache(
+    Config.TRANSLATION_CACHE_MAX_ENTRIES,
+    Config.TRANSLATION_CACHE_TTL_SECONDS,
+    Config.TRANSLATION_CACHE_DB_TTL_DAYS,
+)